@@ -0,0 +1,256 @@
+# benchmark.py
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+import numpy as np
+import log
+from environment import SimCityEnv
+from players import BasePlayer, BalancedPlayer
+from vector_env import VectorSimCityEnv
+
+BASELINE_FILE = "benchmark_baseline.json"
+
+
+def _rate(run, min_time):
+    # Calls per second of run(), repeated until at least min_time has passed;
+    # run() returns the number of units (steps, games) it completed
+    units, start = 0, time.perf_counter()
+    while True:
+        units += run()
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time:
+            return units / elapsed
+
+
+def _players(env, seed=0):
+    return {
+        agent: BalancedPlayer(agent, seed=seed + i)
+        for i, agent in enumerate(env.agents)
+    }
+
+
+def bench_env_step(grid_size, num_players, min_time=0.5, seed=0):
+    """
+    Steps per second of ``SimCityEnv.step`` with uniformly random legal moves.
+
+    Actions come from ``SimCityGame.sample_action``, so neither the env nor the
+    policy touches more than the placed building's stencil per step. Games are
+    reset whenever they end.
+    """
+    rng = np.random.default_rng(seed)
+    env = SimCityEnv(grid_size=grid_size, num_players=num_players, log=False)
+    env.players = {agent: BasePlayer(agent) for agent in env.agents}
+
+    def run():
+        # Every counted step is a real move: finished games are reset first
+        for _ in range(100):
+            if env.is_game_over():
+                env.reset()
+            env.step(env.sample_action(env.agent_selection, rng))
+        return 100
+
+    return _rate(run, min_time)
+
+
+def bench_vector_step(grid_size, num_players, num_envs=256, min_time=0.5, seed=0):
+    # Game steps per second of VectorSimCityEnv with random legal actions
+    rng = np.random.default_rng(seed)
+    env = VectorSimCityEnv(
+        num_envs, grid_size=grid_size, n_agents=num_players, autoreset=True
+    )
+
+    def run():
+        env.step(env.sample_actions(rng))
+        return num_envs
+
+    return _rate(run, min_time)
+
+
+def bench_run_game(grid_size, num_players, log_on, max_moves=200, min_time=0.5):
+    """
+    Games per second of ``run_game`` with BalancedPlayers, truncated after
+    ``max_moves`` moves so large boards finish. With ``log_on`` the text log
+    is written to a temporary file (see ``main``).
+    """
+    games = 0
+
+    def run():
+        nonlocal games
+        env = SimCityEnv(
+            grid_size=grid_size,
+            num_players=num_players,
+            log=log_on,
+            max_moves=max_moves,
+        )
+        env.players = _players(env, seed=games)
+        env.run_game()
+        games += 1
+        return 1
+
+    return _rate(run, min_time)
+
+
+def bench_observe_allocations(grid_size, num_players, calls=200):
+    # Memory blocks still allocated per observe call while observations are
+    # kept, i.e. the arrays and dicts each call creates
+    env = SimCityEnv(grid_size=grid_size, num_players=num_players, log=False)
+    env.players = _players(env)
+    agent = env.agents[0]
+    env.observe(agent)
+    kept = []
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    for _ in range(calls):
+        kept.append(env.observe(agent))
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    stats = after.compare_to(before, "filename")
+    return sum(max(0, s.count_diff) for s in stats) / calls
+
+
+def bench_select_action(grid_size, num_players, calls=2000):
+    # Median BalancedPlayer.select_action latency in microseconds
+    env = SimCityEnv(grid_size=grid_size, num_players=num_players, log=False)
+    env.players = _players(env)
+    agent = env.agents[0]
+    player = env.players[agent]
+    observation = env.observe(agent)
+    times = np.empty(calls)
+    for i in range(calls):
+        start = time.perf_counter()
+        player.select_action(observation)
+        times[i] = time.perf_counter() - start
+    return float(np.median(times) * 1e6)
+
+
+def bench_env_memory(grid_size, num_players, envs=20):
+    # Peak traced bytes per live SimCityEnv with bound players
+    tracemalloc.start()
+    live = []
+    for _ in range(envs):
+        env = SimCityEnv(grid_size=grid_size, num_players=num_players, log=False)
+        env.players = _players(env)
+        live.append(env)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak / envs
+
+
+# name -> (function, unit, higher_is_better, extra keyword arguments)
+BENCHMARKS = {
+    "env_step": (bench_env_step, "steps/s", True, {}),
+    "vector_step": (bench_vector_step, "steps/s", True, {}),
+    "run_game_log_off": (bench_run_game, "games/s", True, {"log_on": False}),
+    "run_game_log_on": (bench_run_game, "games/s", True, {"log_on": True}),
+    "observe_allocations": (bench_observe_allocations, "blocks/call", False, {}),
+    "select_action_latency": (bench_select_action, "us", False, {}),
+    "env_memory": (bench_env_memory, "bytes/env", False, {}),
+}
+
+
+def run_suite(sizes, players, names=None, min_time=0.5):
+    """
+    Run the benchmarks ``names`` (all by default) for every board size and
+    player count.
+
+    Returns ``{"meta": ..., "results": {"name/size=S/players=P": {...}}}``.
+    """
+    results = {}
+    for name in names or BENCHMARKS:
+        function, unit, higher_is_better, kwargs = BENCHMARKS[name]
+        if "min_time" in function.__code__.co_varnames:
+            kwargs = {**kwargs, "min_time": min_time}
+        for size in sizes:
+            for num_players in players:
+                value = function(size, num_players, **kwargs)
+                results[f"{name}/size={size}/players={num_players}"] = {
+                    "value": value,
+                    "unit": unit,
+                    "higher_is_better": higher_is_better,
+                }
+    meta = {
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "time": time.strftime("%Y-%m-%d %H:%M:%S"),
+    }
+    return {"meta": meta, "results": results}
+
+
+def compare(results, baseline, threshold=0.2):
+    """
+    Compare results against a baseline run.
+
+    A benchmark regresses when it is more than ``threshold`` (a fraction)
+    worse than its baseline value, in its own direction. Returns a list of
+    ``(key, baseline value, value, relative change, regressed)``.
+    """
+    rows = []
+    for key, result in results["results"].items():
+        if key not in baseline["results"]:
+            continue
+        base = baseline["results"][key]["value"]
+        value = result["value"]
+        change = (value - base) / base if base else 0.0
+        worse = -change if result["higher_is_better"] else change
+        rows.append((key, base, value, change, worse > threshold))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the benchmark suite.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[4, 16, 64, 256])
+    parser.add_argument("--players", type=int, nargs="+", default=[3, 16])
+    parser.add_argument("--only", nargs="+", choices=list(BENCHMARKS), default=None)
+    parser.add_argument("--min-time", type=float, default=0.5)
+    parser.add_argument("--output", default=None, help="Write results JSON here.")
+    parser.add_argument("--baseline", default=BASELINE_FILE)
+    parser.add_argument(
+        "--save-baseline", action="store_true", help="Store the results as baseline."
+    )
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.2,
+        help="Allowed slowdown as a fraction of the baseline before failing.",
+    )
+    args = parser.parse_args()
+
+    # Benchmarks with logging on write their text log away from game_log.txt
+    with tempfile.TemporaryDirectory() as tmp:
+        log.setup_logging(os.path.join(tmp, "benchmark_log.txt"))
+        results = run_suite(args.sizes, args.players, args.only, args.min_time)
+
+    for key, result in results["results"].items():
+        print(f"{key:<48} {result['value']:>14.1f} {result['unit']}")
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+    if args.save_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(results, f, indent=2)
+        return
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        rows = compare(results, baseline, args.threshold)
+        regressions = [row for row in rows if row[4]]
+        for key, base, value, change, regressed in rows:
+            flag = "REGRESSION" if regressed else ""
+            print(f"{key:<48} {base:>14.1f} -> {value:>14.1f} {change:+7.1%} {flag}")
+        if regressions:
+            print(
+                f"{len(regressions)} benchmark(s) regressed by more than "
+                f"{args.threshold:.0%}"
+            )
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -3,6 +3,9 @@
 # Define building types
 BUILDING_TYPES = ["Park", "House", "Shop"]
 
+# Define resource types, in the order they are stored in resource arrays
+RESOURCE_TYPES = ["money", "reputation"]
+
 # Define building costs
 BUILDING_COSTS = {
     "Park": {"money": 1, "reputation": 3},
@@ -23,3 +26,6 @@ BUILDING_EFFECTS = {
     "House": {"G": -30, "V": 0, "D": 30, "neighbors": {"G": -10, "V": 10, "D": 10}},
     "Shop": {"G": -30, "V": 30, "D": -30, "neighbors": {"G": -10, "V": 10, "D": -10}},
 }
+
+# Define integrated score weights: alpha * self score + beta * environment score
+SCORE_WEIGHTS = {"alpha": 0.5, "beta": 0.5}
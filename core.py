@@ -0,0 +1,849 @@
+# core.py
+from collections import namedtuple
+from time import perf_counter
+import numpy as np
+from players import Resources
+from config import RESOURCE_TYPES
+from rules import DEFAULT_RULES
+from render import TileAtlas, render_frames
+
+_text_log = None
+
+
+def text_log():
+    # Import and configure the text logger the first time a game needs it
+    global _text_log
+    if _text_log is None:
+        import log
+
+        log.setup_logging()
+        _text_log = log
+    return _text_log
+
+
+# Immutable copy of everything that affects future play, see SimCityGame.snapshot
+GameSnapshot = namedtuple(
+    "GameSnapshot",
+    [
+        "state",
+        "derived",
+        "num_moves",
+        "num_buildings",
+        "num_free",
+        "selection_index",
+        "agent_index",
+        "env_score",
+        "terminated",
+        "truncated",
+    ],
+)
+
+
+CONFLICT_RULES = ("priority", "rotate", "random", "void")
+
+
+class SimCityGame:
+    """
+    Game rules, state and scoring of SimCity, without PettingZoo or gymnasium.
+
+    ``SimCityEnv`` in environment.py adds the PettingZoo ``AECEnv`` interface on
+    top of this class. Importing this module does no I/O; the text log is only
+    set up once a game with ``log=True`` writes to it.
+
+    Parameters:
+    - grid_size (int): Side length of the (square) board.
+    - num_players (int): Number of agents, named P1, P2, ...
+    - starting_resources (dict): Resources every agent starts with. When given,
+      they replace the resources of players assigned to ``players``; by default
+      players keep their own resources.
+    - rules (Rules): Compiled rule tables, defaults to the tables in config.py.
+    - log (bool): Write the text game log.
+    - max_moves (int): Move limit after which the game is truncated.
+    - recorder (log.TrajectoryRecorder): Receives the raw state of every turn.
+    - metrics (metrics.StepMetrics): Collects per-phase timings and counters.
+    """
+
+    def __init__(
+        self,
+        grid_size=4,
+        num_players=3,
+        starting_resources=None,
+        rules=None,
+        log=True,
+        max_moves=None,
+        recorder=None,
+        metrics=None,
+    ):
+        self.rules = rules if rules is not None else DEFAULT_RULES
+        self.log = log  # Write the text game log
+        # Truncate games after this many moves, players that cannot afford any
+        # building can otherwise stall a game forever
+        self.max_moves = max_moves
+        # Optional log.TrajectoryRecorder receiving the raw state of every turn
+        self.recorder = recorder
+        # Optional metrics.StepMetrics, phases are only timed when it is set
+        self.metrics = metrics
+        self.grid_size = grid_size
+        self.agents = [f"P{i + 1}" for i in range(num_players)]
+        self.starting_resources = starting_resources
+        self.possible_agents = self.agents[:]
+        self._agent_ids = {agent: i for i, agent in enumerate(self.agents)}
+        # Every per-game array is a view into one structured record, so the
+        # whole state is copied in a single operation
+        size, n_agents = self.grid_size, len(self.agents)
+        # Penalty moves keep counting turns, so turn numbers only fit in int16
+        # when a move limit keeps them below 2**15
+        bounded = max_moves is not None and max_moves <= np.iinfo(np.int16).max
+        turn_dtype = np.int16 if bounded else np.int32
+        self.state = np.zeros(
+            (),
+            dtype=[
+                ("grid", np.int32, (size, size, 3)),
+                ("buildings", np.int8, (size, size)),
+                ("turn_built", turn_dtype, (size, size)),
+                ("builders", np.int32, (size, size)),
+                ("resources", np.int32, (n_agents, len(RESOURCE_TYPES))),
+                ("self_scores", np.int64, (n_agents,)),
+                ("integrated_scores", np.float64, (n_agents,)),
+            ],
+        )
+        self.grid = self.state["grid"]  # G, V, D
+        self.buildings = self.state["buildings"]  # Building type indices
+        self.turn_built = self.state["turn_built"]  # Turn each building was placed on
+        self.builders = self.state["builders"]
+        # Resources of every agent, rows are shared with the bound players
+        self.resources = self.state["resources"]
+        self.resources[...] = [
+            (starting_resources or {}).get(r, 20) for r in RESOURCE_TYPES
+        ]
+        # Scores of every agent as of its last move, mirroring the players
+        self.self_scores = self.state["self_scores"]
+        self.integrated_scores = self.state["integrated_scores"]
+        # Caches derived from the state live in a second record, so snapshots
+        # restore them by copying instead of recomputing them
+        cells, n_types = size * size, self.rules.num_types
+        self._derived = np.zeros(
+            (),
+            dtype=np.dtype(
+                [
+                    ("grid_sums", np.int64, (3,)),
+                    ("type_counts", np.int64, (n_types,)),
+                    ("passive_income", np.int64, (len(RESOURCE_TYPES),)),
+                    ("empty_cells", bool, (cells,)),
+                    ("free_cells", np.int32, (cells,)),
+                    ("free_slots", np.int32, (cells,)),
+                    ("affordable", bool, (n_agents, n_types)),
+                ],
+                align=True,
+            ),
+        )
+        self._grid_sums = self._derived["grid_sums"]
+        self._type_counts = self._derived["type_counts"]
+        self._passive_income = self._derived["passive_income"]
+        self._empty_cells = self._derived["empty_cells"]
+        self._free_cells = self._derived["free_cells"]
+        self._free_slots = self._derived["free_slots"]
+        self._affordable = self._derived["affordable"]
+        # Raw bytes of both records, copied much faster than field by field
+        self._state_bytes = self.state.reshape(1).view(np.uint8)
+        self._derived_bytes = self._derived.reshape(1).view(np.uint8)
+        self._players = {}
+        self._stencil_sums = None
+        # Observation buffers and views, built on first use
+        self._views = None
+        self._flat_observation = None
+        self._flat_views = None
+        self._agent_range = np.arange(num_players)
+        self._atlas = None
+        self.reset()
+
+    @property
+    def players(self):
+        return self._players
+
+    @players.setter
+    def players(self, players):
+        # Move each player's resources into the env's resource array, unless
+        # the game sets its own starting resources
+        for i, agent in enumerate(self.agents):
+            player = players[agent]
+            if self.starting_resources is None:
+                self.resources[i] = [player.resources[r] for r in RESOURCE_TYPES]
+            player.resources = Resources(self.resources[i])
+            player.game = self
+            self.self_scores[i] = player.self_score
+            self.integrated_scores[i] = player.integrated_score
+        self._players = players
+        self._update_affordable()
+
+    def reset(self):
+        # Reset the game state
+        self.grid[...] = 30
+        self.buildings[...] = -1  # -1 indicates no building
+        self.turn_built[...] = 0
+        self.builders[...] = -1  # -1 indicates no builder
+        self.rewards = {agent: 0 for agent in self.agents}
+        self.infos = {agent: {} for agent in self.agents}
+        self.terminations = {agent: False for agent in self.agents}
+        self.truncations = {agent: False for agent in self.agents}
+        # Running G/V/D sums and building counts, updated by each placement so
+        # the env score and passive income never rescan the grid
+        self._grid_sums[...] = self.grid.sum(axis=(0, 1))
+        self._type_counts[...] = 0
+        self._passive_income[...] = 0
+        self._num_buildings = 0
+        # Factors of the legal-action mask: empty cells and, per agent, the
+        # building types it can afford
+        self._empty_cells[...] = True
+        # Empty cells as a dense list (the first _num_free entries) with each
+        # cell's position in it, so a random empty cell is drawn in O(1)
+        self._free_cells[...] = np.arange(self.grid_size**2)
+        self._free_slots[...] = np.arange(self.grid_size**2)
+        self._num_free = self.grid_size**2
+        self._update_affordable()
+        self.env_score = self.calculate_environment_score()["env_score"]
+        self._cumulative_rewards = {agent: 0 for agent in self.agents}
+        # Like PettingZoo's agent_selector after reset() and next(), the second
+        # agent makes the first move
+        self._selection_index = 1 % len(self.agents)
+        self.agent_selection = self.agents[self._selection_index]
+        self.num_moves = 0
+        self.has_reset = True  # Indicate that the environment is ready for a step
+        self.agent_index = 0
+
+    def step(self, action):
+        if not self.has_reset:
+            raise RuntimeError("Environment must be reset before calling step.")
+
+        agent = self.agent_selection
+        metrics = self.metrics
+        if metrics is not None:
+            t = perf_counter()
+
+        if self.terminations[agent] or self.truncations[agent]:
+            # No action required if agent is terminated
+            self._was_done_step(action)
+            return
+
+        # Reset the cumulative reward for this agent
+        self._cumulative_rewards[agent] = 0
+
+        # Initialize info
+        self.infos[agent] = {}
+
+        # Initialize reward for this step
+        reward = 0
+        info_resources = {}
+
+        # Decode action
+        type_idx, x, y = self._decode_action_index(action)
+        agent_idx = self._agent_ids[agent]
+        rules = self.rules
+        if metrics is not None:
+            metrics.count("steps")
+            if not self._is_valid_action(action):
+                metrics.count("invalid_actions")
+            t = metrics.lap("decode", t)
+
+        # Check if the cell is empty
+        if self.buildings[x, y] >= 0:
+            # Cell already occupied: assign a penalty
+            reward -= 5  # Example penalty
+            if metrics is not None:
+                metrics.count("penalty_moves")
+        else:
+            building_cost = rules.costs[type_idx]
+            player_resources = self.resources[agent_idx]
+
+            # Check if the player has enough resources for initial build
+            if (player_resources < building_cost).any():
+                # Not enough resources: assign a penalty
+                reward -= 5
+                if metrics is not None:
+                    metrics.count("penalty_moves")
+            else:
+                # Deduct initial costs
+                player_resources -= building_cost
+
+                # Place the building
+                self.buildings[x, y] = type_idx
+                self.turn_built[x, y] = self.num_moves
+                self.builders[x][y] = agent_idx
+                self._remove_free_cell(x * self.grid_size + y)
+                if metrics is not None:
+                    t = metrics.lap("placement", t)
+
+                # Update the grid with the building's stencil, clipped to the board
+                r = rules.radius
+                x0, x1 = max(x - r, 0), min(x + r + 1, self.grid_size)
+                y0, y1 = max(y - r, 0), min(y + r + 1, self.grid_size)
+                effect = rules.kernels[
+                    type_idx, x0 - x + r : x1 - x + r, y0 - y + r : y1 - y + r
+                ]
+                self.grid[x0:x1, y0:y1] += effect
+                self._grid_sums += effect.sum(axis=(0, 1))
+                if metrics is not None:
+                    t = metrics.lap("neighbor_effects", t)
+
+                # Add the building to the passive income paid every turn
+                building_utility = rules.utilities[type_idx]
+                self._type_counts[type_idx] += 1
+                self._passive_income += building_utility
+                self._num_buildings += 1
+
+                # Add immediate utility reward for the initial build
+                reward += int(rules.utility_rewards[type_idx])
+
+                # Record the resource changes
+                info_resources = dict(
+                    zip(RESOURCE_TYPES, (building_utility - building_cost).tolist())
+                )
+
+        # Apply ongoing building utilities (passive income or effects) of all
+        # buildings on the grid, and accumulate them in self_score
+        self.resources[agent_idx] += self._passive_income
+        reward += int(self._passive_income.sum())
+        self._update_affordable(agent_idx)
+        if metrics is not None:
+            t = metrics.lap("passive_income", t)
+
+        # Update player's self_score
+        player = self.players[agent]
+        player.self_score += reward
+
+        # Update cumulative reward for the agent
+        self._cumulative_rewards[agent] += reward
+
+        # Update the environment score
+        self.env_score = self._environment_score()
+
+        # Update the agent's integrated score
+        alpha, beta = self.rules.alpha, self.rules.beta
+        player.integrated_score = alpha * player.self_score + beta * self.env_score
+        self.self_scores[agent_idx] = player.self_score
+        self.integrated_scores[agent_idx] = player.integrated_score
+        if metrics is not None:
+            t = metrics.lap("score", t)
+
+        # Log the environment score
+        if self.log:
+            text_log().log_environment_score(self.env_score)
+            if metrics is not None:
+                metrics.lap("logging", t)
+
+        # Prepare info to send to the player
+        self.infos[agent]["resources"] = info_resources
+
+        # Check for game end conditions
+        self.num_moves += 1
+        if self.is_game_over():
+            for ag in self.agents:
+                self.terminations[ag] = True
+            if metrics is not None:
+                board_filled = self._num_buildings == self.grid_size**2
+                metrics.count_termination(
+                    "board_filled" if board_filled else "env_score"
+                )
+        elif self.max_moves is not None and self.num_moves >= self.max_moves:
+            for ag in self.agents:
+                self.truncations[ag] = True
+            if metrics is not None:
+                metrics.count_termination("max_moves")
+
+        if self.recorder is not None:
+            self.recorder.record(self, agent_idx, action)
+
+        # Advance to the next agent
+        self._next_agent()
+
+        # Allow the next step
+        self.has_reset = True
+
+    def play_round(self, actions, conflict="priority", rng=None):
+        """
+        Apply one simultaneous move of every agent, for the parallel API.
+
+        Each agent's action is checked against the board and its own
+        resources as in ``step``. When several agents claim the same empty
+        cell, ``conflict`` decides: "priority" gives it to the first agent in
+        ``agents`` order, "rotate" to the first in an order that rotates by one
+        agent every round, "random" to a draw from ``rng``, and "void" to
+        nobody. Agents that do not get their cell are penalized as for an
+        occupied one. All placements, then one round of passive income for
+        every agent and a single score update are applied in one pass.
+        An agent whose action is None makes no move: it places nothing and is
+        not penalized, but still receives the round's passive income.
+
+        Parameters:
+        - actions (list): One action (or None) per agent, in ``agents`` order.
+        - conflict (str): One of ``CONFLICT_RULES``.
+        - rng (np.random.Generator): Draws the "random" conflict winners.
+
+        Returns the per-agent rewards as an array.
+        """
+        if conflict not in CONFLICT_RULES:
+            raise ValueError(f"conflict must be one of {CONFLICT_RULES}")
+        n, rules, cells = len(self.agents), self.rules, self.grid_size**2
+        moving = np.array([a is not None for a in actions], dtype=bool)
+        actions = np.array(
+            [a if a is not None and self._is_valid_action(a) else 0 for a in actions],
+            dtype=np.int64,
+        )
+        types, positions = np.divmod(actions, cells)
+        agent_ids = np.arange(n)
+        wants = (
+            moving & self._empty_cells[positions] & self._affordable[agent_ids, types]
+        )
+
+        # Rank the agents, the best ranked claimant of a cell gets it
+        if conflict == "rotate":
+            rank = (agent_ids - self.num_moves // n) % n
+        elif conflict == "random":
+            rank = rng.permutation(n)
+        else:
+            rank = agent_ids
+        claimants = np.flatnonzero(wants)
+        claimants = claimants[np.lexsort((rank[claimants], positions[claimants]))]
+        first = np.ones(claimants.size, dtype=bool)
+        first[1:] = positions[claimants[1:]] != positions[claimants[:-1]]
+        if conflict == "void":
+            contested = np.zeros(claimants.size, dtype=bool)
+            contested[1:] |= ~first[1:]
+            contested[:-1] |= ~first[1:]
+            winners = claimants[~contested]
+        else:
+            winners = claimants[first]
+
+        rewards = np.where(moving, -5, 0).astype(np.int64)
+        rewards[winners] = rules.utility_rewards[types[winners]]
+        r = rules.radius
+        for agent_idx in winners.tolist():
+            type_idx = int(types[agent_idx])
+            x, y = divmod(int(positions[agent_idx]), self.grid_size)
+            self.resources[agent_idx] -= rules.costs[type_idx]
+            self.buildings[x, y] = type_idx
+            self.turn_built[x, y] = self.num_moves
+            self.builders[x, y] = agent_idx
+            self._remove_free_cell(x * self.grid_size + y)
+            x0, x1 = max(x - r, 0), min(x + r + 1, self.grid_size)
+            y0, y1 = max(y - r, 0), min(y + r + 1, self.grid_size)
+            effect = rules.kernels[
+                type_idx, x0 - x + r : x1 - x + r, y0 - y + r : y1 - y + r
+            ]
+            self.grid[x0:x1, y0:y1] += effect
+            self._grid_sums += effect.sum(axis=(0, 1))
+            self._type_counts[type_idx] += 1
+            self._passive_income += rules.utilities[type_idx]
+            self._num_buildings += 1
+
+        # Passive income of every building is paid to every agent once a round
+        self.resources += self._passive_income
+        rewards += int(self._passive_income.sum())
+        self._update_affordable()
+
+        # Update the environment score and every agent's scores
+        self.env_score = self._environment_score()
+        alpha, beta = self.rules.alpha, self.rules.beta
+        self.self_scores += rewards
+        self.integrated_scores[...] = alpha * self.self_scores + beta * self.env_score
+        for i, agent in enumerate(self.agents):
+            player = self._players.get(agent)
+            if player is not None:
+                player.self_score = int(self.self_scores[i])
+                player.integrated_score = float(self.integrated_scores[i])
+
+        if self.log:
+            text_log().log_environment_score(self.env_score)
+
+        # Check for game end conditions
+        self.num_moves += n
+        if self.is_game_over():
+            for agent in self.agents:
+                self.terminations[agent] = True
+        elif self.max_moves is not None and self.num_moves >= self.max_moves:
+            for agent in self.agents:
+                self.truncations[agent] = True
+        return rewards
+
+    def restart(self):
+        # Reset the board and also every agent's resources and scores, for
+        # games that are not driven through bound players
+        self.reset()
+        self.resources[...] = [
+            (self.starting_resources or {}).get(r, 20) for r in RESOURCE_TYPES
+        ]
+        self.self_scores[...] = 0
+        self.integrated_scores[...] = 0
+        self._update_affordable()
+
+    def decode_action(self, action):
+        # Decode action to building type and position
+        building_type_idx, x, y = self._decode_action_index(action)
+        return self.rules.building_types[building_type_idx], x, y
+
+    def _is_valid_action(self, action):
+        return (
+            isinstance(action, int)
+            and 0 <= action < self.grid_size**2 * self.rules.num_types
+        )
+
+    def _decode_action_index(self, action):
+        if not self._is_valid_action(action):
+            # Invalid action, return default action (first building type at 0, 0)
+            return 0, 0, 0
+        total_positions = self.grid_size**2
+        building_type_idx = action // total_positions
+        position_idx = action % total_positions
+        x = position_idx // self.grid_size
+        y = position_idx % self.grid_size
+        return building_type_idx, x, y
+
+    def calculate_environment_score(self):
+        # Channel averages from the running sums, equal to np.mean of the grid
+        G_avg, V_avg, D_avg = self._grid_sums / self.grid_size**2
+        env_score = (1 / 3) * G_avg + (1 / 3) * V_avg + (1 / 3) * D_avg
+        return {"G_avg": G_avg, "V_avg": V_avg, "D_avg": D_avg, "env_score": env_score}
+
+    def _environment_score(self):
+        G_sum, V_sum, D_sum = self._grid_sums.tolist()
+        cells = self.grid_size**2
+        return (
+            (1 / 3) * (G_sum / cells)
+            + (1 / 3) * (V_sum / cells)
+            + (1 / 3) * (D_sum / cells)
+        )
+
+    def is_game_over(self):
+        # Game ends when the board is filled or environment score < 10
+        board_filled = self._num_buildings == self.grid_size**2
+        if board_filled or self.env_score < 10:
+            return True
+        return False
+
+    def observe(self, agent, view=False):
+        """
+        Return the observation for the agent.
+
+        With ``view=True`` the grid, builders and resources are read-only views
+        of the live game arrays instead of copies, for callers that neither
+        mutate nor keep them past the next step.
+        """
+        if view:
+            if self._views is None:
+                self._views = [a.view() for a in (self.grid, self.builders)] + [
+                    self.resources[i] for i in range(len(self.agents))
+                ]
+                for array in self._views:
+                    array.flags.writeable = False
+            grid, builders, *resources = self._views
+            return {
+                "grid": grid,
+                "resources": Resources(resources[self._agent_ids[agent]]),
+                "builders": builders,
+                "action_mask": self.action_mask(agent),
+            }
+        observation = {
+            "grid": self.grid.copy(),
+            "resources": self.players[
+                agent
+            ].resources.copy(),  # Use player's own resources
+            "builders": self.builders.copy(),
+            "action_mask": self.action_mask(agent),
+        }
+        return observation
+
+    def observation_layout(self):
+        """
+        Layout of the flat observation written by ``observe_into``: name ->
+        ``(start, stop, shape)``. Blocks are the G/V/D grid, the builders
+        one-hot encoded per agent (all zeros on empty cells), the agent's own
+        resources in ``RESOURCE_TYPES`` order and the action mask.
+        """
+        size, n_agents = self.grid_size, len(self.agents)
+        blocks = [
+            ("grid", (size, size, 3)),
+            ("builders", (size, size, n_agents)),
+            ("resources", (len(RESOURCE_TYPES),)),
+            ("action_mask", (self.rules.num_types, size * size)),
+        ]
+        layout, start = {}, 0
+        for name, shape in blocks:
+            stop = start + int(np.prod(shape))
+            layout[name] = (start, stop, shape)
+            start = stop
+        return layout
+
+    def observe_into(self, agent, out=None):
+        """
+        Write the flat observation of ``agent`` into ``out`` and return it.
+
+        ``out`` is any 1-D numeric array of the ``observation_layout`` size,
+        e.g. a row of a trainer's batch buffer; by default a float32 buffer
+        owned by the game is reused. Every block is written in place through
+        views of ``out`` cached for the memory it covers, so a game that
+        keeps writing into the same buffer row allocates no per-call arrays.
+        """
+        if out is None:
+            if self._flat_observation is None:
+                size = self.observation_layout()["action_mask"][1]
+                self._flat_observation = np.zeros(size, dtype=np.float32)
+            out = self._flat_observation
+        # Views are cached by the memory they cover rather than by the array
+        # object, so a fresh view of the same batch row (B[i]) reuses them;
+        # the cached views keep that memory alive
+        key = (out.__array_interface__["data"][0], out.strides, out.dtype, out.size)
+        if self._flat_views is None or self._flat_views[0] != key:
+            self._flat_views = (key,) + tuple(
+                out[start:stop].reshape(shape)
+                for start, stop, shape in self.observation_layout().values()
+            )
+        _, grid, builders, resources, action_mask = self._flat_views
+        agent_idx = self._agent_ids[agent]
+        grid[...] = self.grid
+        np.equal(self.builders[..., None], self._agent_range, out=builders)
+        resources[...] = self.resources[agent_idx]
+        np.logical_and(
+            self._affordable[agent_idx, :, None], self._empty_cells, out=action_mask
+        )
+        return out
+
+    def _remove_free_cell(self, cell):
+        self._empty_cells[cell] = False
+        slot, last = self._free_slots[cell], self._free_cells[self._num_free - 1]
+        self._free_cells[slot] = last
+        self._free_slots[last] = slot
+        self._num_free -= 1
+
+    def encode_action(self, building_type_idx, x, y):
+        return (building_type_idx * self.grid_size + x) * self.grid_size + y
+
+    def sample_action(self, agent, rng):
+        """
+        Draw a uniformly random legal action for ``agent``, or -1 if it has none.
+
+        Legal actions are every affordable type times every empty cell, so a
+        type and a cell are drawn independently; the cost does not depend on
+        the board size or the number of actions.
+        """
+        affordable = np.flatnonzero(self._affordable[self._agent_ids[agent]])
+        if not affordable.size or not self._num_free:
+            return -1
+        building_type_idx = int(affordable[rng.integers(affordable.size)])
+        cell = int(self._free_cells[rng.integers(self._num_free)])
+        return building_type_idx * self.grid_size**2 + cell
+
+    def evaluate_actions(self, agent):
+        """
+        What ``step`` would do for every action of ``agent``, without playing it.
+
+        Returns a dict of arrays in action order:
+        - legal (np.array): Action mask, as ``action_mask``.
+        - reward (np.array): Immediate reward, including passive income (the
+          penalty plus passive income for illegal actions).
+        - resources (np.array): ``(A, 2)`` net change of the agent's resources.
+        - env_score (np.array): Env score after the action.
+        """
+        rules, cells = self.rules, self.grid_size**2
+        legal = self.action_mask(agent).view(bool).reshape(rules.num_types, cells)
+        passive = self._passive_income
+        # Placing a type pays its utility once now and again as passive income
+        placed_reward = 2 * rules.utility_rewards + passive.sum()
+        reward = np.where(legal, placed_reward[:, None], passive.sum() - 5)
+        placed_resources = rules.utilities - rules.costs + passive
+        resources = np.where(
+            legal[:, :, None], placed_resources[:, None, :], passive.astype(np.int64)
+        )
+        sums = np.where(
+            legal[:, :, None],
+            self._grid_sums + self._clipped_stencil_sums(),
+            self._grid_sums,
+        )
+        env_score = (
+            (1 / 3) * (sums[..., 0] / cells)
+            + (1 / 3) * (sums[..., 1] / cells)
+            + (1 / 3) * (sums[..., 2] / cells)
+        )
+        return {
+            "legal": legal.ravel(),
+            "reward": reward.ravel(),
+            "resources": resources.reshape(-1, len(RESOURCE_TYPES)),
+            "env_score": env_score.ravel(),
+        }
+
+    def _clipped_stencil_sums(self):
+        # (T, cells, 3) G/V/D added to the board by each type on each cell, the
+        # stencil clipped to the board; depends only on rules and board size
+        if self._stencil_sums is None:
+            size, rules = self.grid_size, self.rules
+            x, y = np.divmod(np.arange(size**2), size)
+            nx = x + rules.offsets[:, :1]
+            ny = y + rules.offsets[:, 1:]
+            inside = (nx >= 0) & (nx < size) & (ny >= 0) & (ny < size)
+            self._stencil_sums = np.einsum(
+                "kc,tkx->tcx", inside.astype(np.int64), rules.offset_effects
+            )
+        return self._stencil_sums
+
+    def action_mask(self, agent):
+        # Legal actions (affordable building type x empty cell) in action order
+        affordable = self._affordable[self._agent_ids[agent]]
+        return (affordable[:, None] & self._empty_cells).ravel().view(np.int8)
+
+    def _update_affordable(self, agent_idx=None):
+        # Refresh which building types an agent (or every agent) can afford
+        if agent_idx is None:
+            self._affordable[...] = np.all(
+                self.resources[:, None, :] >= self.rules.costs, axis=2
+            )
+        else:
+            self._affordable[agent_idx] = np.all(
+                self.resources[agent_idx] >= self.rules.costs, axis=1
+            )
+
+    def snapshot(self):
+        """
+        Return an immutable ``GameSnapshot`` of everything that affects future
+        play: the state record (grid, buildings, builders, resources, scores),
+        its derived caches, the move count and the agent to move.
+
+        Both records are stored as raw bytes, read the state back with
+        ``np.frombuffer(snapshot.state, env.state.dtype)[0]``. Bookkeeping that
+        does not affect play (rewards, infos, the players' policies and random
+        generators) is not included.
+        """
+        return GameSnapshot(
+            self._state_bytes.tobytes(),
+            self._derived_bytes.tobytes(),
+            self.num_moves,
+            self._num_buildings,
+            self._num_free,
+            self._selection_index,
+            self.agent_index,
+            self.env_score,
+            self.terminations[self.agents[0]],
+            self.truncations[self.agents[0]],
+        )
+
+    def restore(self, snapshot):
+        """
+        Reload a ``GameSnapshot`` taken from this game (or one with the same
+        board size, players and rules).
+
+        Arrays are copied in place, so the players' resource views stay bound,
+        and the players' scores are set from the restored state.
+        """
+        self._state_bytes[...] = np.frombuffer(snapshot.state, np.uint8)
+        self._derived_bytes[...] = np.frombuffer(snapshot.derived, np.uint8)
+        self.num_moves = snapshot.num_moves
+        self._num_buildings = snapshot.num_buildings
+        self._num_free = snapshot.num_free
+        self._selection_index = snapshot.selection_index
+        self.agent_selection = self.agents[snapshot.selection_index]
+        self.agent_index = snapshot.agent_index
+        self.env_score = snapshot.env_score
+        for i, agent in enumerate(self.agents):
+            self.terminations[agent] = snapshot.terminated
+            self.truncations[agent] = snapshot.truncated
+            player = self._players.get(agent)
+            if player is not None:
+                player.self_score = int(self.self_scores[i])
+                player.integrated_score = float(self.integrated_scores[i])
+
+    def render(self, mode="human"):
+        # Render the game state as text, or as an RGB frame for "rgb_array"
+        if mode == "rgb_array":
+            if self._atlas is None:
+                self._atlas = TileAtlas(self.rules.num_types, len(self.agents))
+            return render_frames(
+                self._atlas, self.buildings[None], self.builders[None], self.grid[None]
+            )[0]
+        display_grid = ""
+        for x in range(self.grid_size):
+            row = ""
+            for y in range(self.grid_size):
+                building = self.buildings[x, y]
+                if building < 0:
+                    row += "[ ]"
+                else:
+                    row += f"[{self.rules.building_types[building][0]}]"
+            display_grid += row + "\n"
+        print(display_grid)
+
+    def close(self):
+        pass
+
+    def _next_agent(self):
+        self._selection_index = (self._selection_index + 1) % len(self.agents)
+        self.agent_selection = self.agents[self._selection_index]
+
+    def _was_done_step(self, action):
+        # Required by PettingZoo
+        self._cumulative_rewards[self.agent_selection] = 0
+        self.rewards[self.agent_selection] = 0
+        self.infos[self.agent_selection] = {}
+        # Advance to the next agent
+        self._next_agent()
+
+    def get_observation(self, agent_id):
+        return self.observe(agent_id)
+
+    def run_game(self):
+        # Play a whole game, asking the bound players for their actions
+        turns = self.turns()
+        try:
+            agent_id, observation = next(turns)
+            while True:
+                action = self.players[agent_id].select_action(observation)
+                agent_id, observation = turns.send(action)
+        except StopIteration:
+            pass
+
+    def turns(self):
+        """
+        The game loop of ``run_game`` as a generator: it yields
+        ``(agent_id, observation)`` whenever an action is needed and expects
+        the action back through ``send``. Schedulers use it to drive many games
+        without one thread per game.
+        """
+        if self.recorder is not None:
+            self.recorder.record(self, self.agent_index, -1, start=True)
+        if self.log:
+            log = text_log()
+            # Log initial state (Turn 0)
+            log.display_current_turn(self.num_moves, self.agents[self.agent_index])
+            log.display_board(
+                self.buildings,
+                self.grid,
+                self.builders,
+                self.agents,
+                self.rules.building_types,
+            )
+            log.display_player_stats(self.players)
+
+        metrics = self.metrics
+        while not (self.is_game_over() or self.truncations[self.agent_selection]):
+            agent_id = self.agents[self.agent_index]
+            if metrics is not None:
+                t = perf_counter()
+            observation = self.get_observation(agent_id)
+            action = yield agent_id, observation
+            if metrics is not None:
+                metrics.lap("select_action", t)
+            self.step(action)
+            self.agent_index = (self.agent_index + 1) % len(self.agents)
+            if self.log:
+                if metrics is not None:
+                    t = perf_counter()
+                # Log current turn and board state
+                log.display_current_turn(self.num_moves, agent_id)
+                log.display_board(
+                    self.buildings,
+                    self.grid,
+                    self.builders,
+                    self.agents,
+                    self.rules.building_types,
+                )
+                log.display_player_stats(self.players)
+                log.log_environment_score(self.calculate_environment_score())
+                if metrics is not None:
+                    metrics.lap("logging", t)
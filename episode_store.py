@@ -0,0 +1,250 @@
+# episode_store.py
+import json
+import os
+import numpy as np
+from config import RESOURCE_TYPES
+
+STORE_VERSION = 1
+EPISODE_FILE = "episodes.bin"
+META_FILE = "meta.json"
+
+
+def store_columns(grid_size, n_agents, num_actions):
+    # Column name -> (dtype, per-transition shape) of one transition
+    return {
+        "grid": (np.int32, (grid_size, grid_size, 3)),
+        "builders": (np.int8, (grid_size, grid_size)),
+        "resources": (np.int32, (n_agents, len(RESOURCE_TYPES))),
+        "agent": (np.int8, ()),
+        "action": (np.int32, ()),
+        "action_mask": (np.uint8, ((num_actions + 7) // 8,)),  # Packed bits
+        "reward": (np.int32, ()),
+        "terminated": (bool, ()),
+        "truncated": (bool, ()),
+    }
+
+
+class EpisodeWriter:
+    """
+    Appends the transitions of played games to a columnar episode store.
+
+    A transition holds what the agent to move observed (grid, builders, every
+    agent's resources and its action mask, packed to bits), the agent, its
+    action, its reward and whether the game terminated or was truncated. Each
+    column is a raw fixed-dtype file in ``directory``, and ``episodes.bin``
+    holds the ``(start, length)`` of every finished episode. Transitions are
+    copied into preallocated column buffers and written in bulk, so recording
+    allocates no Python objects per transition.
+
+    The writer follows the recorder protocol of ``SimCityGame``: set it as
+    ``env.recorder`` and ``run_game`` calls ``record`` with the initial state
+    and after every step. Writing to an existing store appends to it.
+
+    Parameters:
+    - directory (str): Store directory, created if needed.
+    - env (SimCityGame): Env whose games are recorded (fixes the column shapes).
+    - capacity (int): Transitions buffered in memory between writes.
+    """
+
+    def __init__(self, directory, env, capacity=65536):
+        self.directory = directory
+        num_actions = env.grid_size**2 * env.rules.num_types
+        self.columns = store_columns(env.grid_size, len(env.agents), num_actions)
+        meta = {
+            "version": STORE_VERSION,
+            "grid_size": env.grid_size,
+            "agents": list(env.agents),
+            "building_types": list(env.rules.building_types),
+            "resource_types": RESOURCE_TYPES,
+            "num_actions": num_actions,
+            "columns": {
+                name: {"dtype": np.dtype(dtype).str, "shape": list(shape)}
+                for name, (dtype, shape) in self.columns.items()
+            },
+        }
+        os.makedirs(directory, exist_ok=True)
+        meta_path = os.path.join(directory, META_FILE)
+        if os.path.exists(meta_path):
+            with open(meta_path) as f:
+                if json.load(f) != meta:
+                    raise ValueError(f"{directory} holds a store of another layout")
+        else:
+            with open(meta_path, "w") as f:
+                json.dump(meta, f, indent=2)
+
+        self.buffers = {
+            name: np.zeros((capacity,) + shape, dtype=dtype)
+            for name, (dtype, shape) in self.columns.items()
+        }
+        self.files = {
+            name: open(os.path.join(directory, f"{name}.bin"), "ab")
+            for name in self.columns
+        }
+        self.episode_file = open(os.path.join(directory, EPISODE_FILE), "ab")
+        # Rows already on disk, the next transition's global index
+        action_path = os.path.join(directory, "action.bin")
+        self.rows = os.path.getsize(action_path) // np.dtype(np.int32).itemsize
+        self.size = 0
+        self.episodes = []
+        self.episode_start = None
+        # Observation of the agent to move, staged until its action is recorded
+        self._obs = {
+            name: np.zeros(self.columns[name][1], dtype=self.columns[name][0])
+            for name in ("grid", "builders", "resources", "action_mask")
+        }
+        self._staged = False
+
+    def _stage(self, env):
+        self._obs["grid"][...] = env.grid
+        self._obs["builders"][...] = env.builders
+        self._obs["resources"][...] = env.resources
+        self._obs["action_mask"][...] = np.packbits(
+            env.action_mask(env.agent_selection)
+        )
+        self._staged = True
+
+    def record(self, env, agent_idx, action):
+        """
+        Record the step ``env`` just played, or stage the initial state when
+        no observation is staged (the first call of every game).
+        """
+        if not self._staged:
+            self._stage(env)
+            return
+        if self.episode_start is None:
+            self.episode_start = self.rows + self.size
+        i = self.size
+        buffers = self.buffers
+        for name, value in self._obs.items():
+            buffers[name][i] = value
+        agent = env.agents[agent_idx]
+        buffers["agent"][i] = agent_idx
+        valid = isinstance(action, int) and 0 <= action < 2**31
+        buffers["action"][i] = action if valid else -1
+        buffers["reward"][i] = env._cumulative_rewards[agent]
+        terminated = env.terminations[agent]
+        truncated = env.truncations[agent]
+        buffers["terminated"][i] = terminated
+        buffers["truncated"][i] = truncated
+        self.size = i + 1
+
+        if terminated or truncated:
+            end = self.rows + self.size
+            self.episodes.append((self.episode_start, end - self.episode_start))
+            self.episode_start = None
+            self._staged = False
+        else:
+            self._stage(env)
+        if self.size == len(buffers["action"]):
+            self.flush()
+
+    def flush(self):
+        for name, f in self.files.items():
+            f.write(self.buffers[name][: self.size].tobytes())
+            f.flush()
+        # Index episodes only once all of their rows are on disk
+        if self.episodes:
+            self.episode_file.write(np.array(self.episodes, dtype=np.int64).tobytes())
+            self.episode_file.flush()
+            self.episodes = []
+        self.rows += self.size
+        self.size = 0
+
+    def close(self):
+        if not self.episode_file.closed:
+            self.flush()
+            for f in self.files.values():
+                f.close()
+            self.episode_file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class EpisodeStore:
+    """
+    Read-only, memory-mapped view of an episode store written by
+    ``EpisodeWriter``.
+
+    Columns are memory-mapped, so indexing or sampling reads only the rows it
+    touches. Rows of an episode whose writer stopped before finishing it are
+    not part of any episode and are never sampled.
+
+    Attributes:
+    - meta (dict): Store layout and game description.
+    - columns (dict): Column name to ``(rows, ...)`` memmap.
+    - episodes (np.array): ``(E, 2)`` start row and length of every episode.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        with open(os.path.join(directory, META_FILE)) as f:
+            self.meta = json.load(f)
+        self.num_actions = self.meta["num_actions"]
+        episode_path = os.path.join(directory, EPISODE_FILE)
+        if os.path.getsize(episode_path):
+            self.episodes = np.memmap(episode_path, dtype=np.int64, mode="r")
+            self.episodes = self.episodes.reshape(-1, 2)
+        else:
+            self.episodes = np.zeros((0, 2), dtype=np.int64)
+        self.columns = {}
+        for name, column in self.meta["columns"].items():
+            dtype, shape = np.dtype(column["dtype"]), tuple(column["shape"])
+            path = os.path.join(directory, f"{name}.bin")
+            rows = os.path.getsize(path) // (dtype.itemsize * int(np.prod(shape)))
+            if rows:
+                self.columns[name] = np.memmap(
+                    path, dtype=dtype, mode="r", shape=(rows,) + shape
+                )
+            else:
+                self.columns[name] = np.zeros((0,) + shape, dtype=dtype)
+        # Transitions before each episode, to number the finished ones densely
+        self._starts = np.asarray(self.episodes[:, 0])
+        self._cumulative = np.concatenate([[0], np.cumsum(self.episodes[:, 1])])
+
+    def __len__(self):
+        # Transitions in finished episodes
+        return int(self._cumulative[-1])
+
+    def episode(self, index):
+        # Every column of one episode, as memmap slices
+        start, length = (int(v) for v in self.episodes[index])
+        return {
+            name: column[start : start + length]
+            for name, column in self.columns.items()
+        }
+
+    def rows_of(self, transitions):
+        # Row numbers of transitions counted over the finished episodes only
+        episode = np.searchsorted(self._cumulative, transitions, side="right") - 1
+        return self._starts[episode] + (transitions - self._cumulative[episode])
+
+    def get(self, rows):
+        """
+        Gather transitions by row number.
+
+        Returns a dict of arrays, with ``action_mask`` unpacked to ``(B, A)``
+        and ``next_grid``/``next_builders``/``next_resources`` holding the
+        following observation (the same row for the last step of an episode).
+        """
+        rows = np.asarray(rows, dtype=np.int64)
+        batch = {
+            name: np.asarray(column[rows]) for name, column in self.columns.items()
+        }
+        batch["action_mask"] = np.unpackbits(
+            batch["action_mask"], axis=1, count=self.num_actions
+        )
+        done = batch["terminated"] | batch["truncated"]
+        next_rows = np.where(done, rows, rows + 1)
+        for name in ("grid", "builders", "resources"):
+            batch[f"next_{name}"] = np.asarray(self.columns[name][next_rows])
+        return batch
+
+    def sample(self, batch_size, rng=None):
+        # Uniform random minibatch of transitions from the finished episodes
+        rng = rng if rng is not None else np.random.default_rng()
+        transitions = rng.integers(len(self), size=batch_size)
+        return self.get(self.rows_of(transitions))
@@ -0,0 +1,326 @@
+# equivalence.py
+import argparse
+import json
+from collections import namedtuple
+import numpy as np
+from config import RESOURCE_TYPES
+from core import SimCityGame
+from environment import SimCityEnv
+from players import BasePlayer
+from vector_env import VectorSimCityEnv
+
+# Per-step fields compared between engines, in the order they are checked
+FIELDS = ["agent", "reward", "grid", "builders", "resources", "terminated", "env_score"]
+
+GOLDEN_FILE = "golden_trajectories.npz"
+
+# First step at which an engine disagrees with a reference trajectory
+Divergence = namedtuple(
+    "Divergence", ["trajectory", "step", "action", "field", "expected", "actual"]
+)
+
+
+class ReferenceEngine:
+    """
+    ``SimCityEnv`` driven one AEC step at a time: the behavior every other
+    engine must reproduce.
+
+    Engines are reset with a scenario (``grid_size``, ``num_players`` and
+    ``starting_resources``) and return the state after every step as a dict
+    of ``FIELDS``: the index of the agent that acted, its reward, the board,
+    every agent's resources, whether the game ended and the env score.
+    """
+
+    def reset(self, scenario):
+        self.env = SimCityEnv(
+            grid_size=scenario["grid_size"],
+            num_players=scenario["num_players"],
+            starting_resources=scenario["starting_resources"],
+            log=False,
+        )
+        self.env.players = {agent: BasePlayer(agent) for agent in self.env.agents}
+
+    def step(self, action):
+        env = self.env
+        agent_idx = env.agents.index(env.agent_selection)
+        score = int(env.self_scores[agent_idx])
+        env.step(action)
+        return {
+            "agent": agent_idx,
+            "reward": int(env.self_scores[agent_idx]) - score,
+            "grid": env.grid.copy(),
+            "builders": env.builders.copy(),
+            "resources": env.resources.copy(),
+            "terminated": env.terminations[env.agents[agent_idx]],
+            "env_score": float(env.env_score),
+        }
+
+    def sample_action(self, rng):
+        # A random legal action of the agent to move (-1 if it has none)
+        return self.env.sample_action(self.env.agent_selection, rng)
+
+
+class SnapshotEngine(ReferenceEngine):
+    """
+    Reference engine that, before every real step, snapshots the game, plays
+    a throwaway random action and restores the snapshot, so the incremental
+    caches (free-cell list, affordability, running sums) must survive
+    ``snapshot``/``restore`` exactly.
+    """
+
+    def reset(self, scenario):
+        super().reset(scenario)
+        self._rng = np.random.default_rng(0)
+
+    def step(self, action):
+        env = self.env
+        snapshot = env.snapshot()
+        env.step(int(self._rng.integers(-1, env.grid_size**2 * env.rules.num_types)))
+        env.restore(snapshot)
+        return super().step(action)
+
+
+class GameEngine(ReferenceEngine):
+    # SimCityGame without the PettingZoo layer, restarted through ``restart``
+    def reset(self, scenario):
+        self.env = SimCityGame(
+            grid_size=scenario["grid_size"],
+            num_players=scenario["num_players"],
+            starting_resources=scenario["starting_resources"],
+            log=False,
+        )
+        self.env.players = {agent: BasePlayer(agent) for agent in self.env.agents}
+        self.env.restart()
+
+
+class VectorEngine:
+    # A single game of VectorSimCityEnv
+    def reset(self, scenario):
+        self.env = VectorSimCityEnv(
+            1,
+            grid_size=scenario["grid_size"],
+            n_agents=scenario["num_players"],
+            starting_resources=scenario["starting_resources"],
+        )
+
+    def step(self, action):
+        env = self.env
+        agent_idx = int(env.agent_index[0])
+        rewards, terminated, _ = env.step([action])
+        return {
+            "agent": agent_idx,
+            "reward": int(rewards[0]),
+            "grid": env.grid[0].copy(),
+            "builders": env.builders[0].copy(),
+            "resources": env.resources[0].copy(),
+            "terminated": bool(terminated[0]),
+            "env_score": float(env.env_scores[0]),
+        }
+
+
+ENGINES = {
+    "reference": ReferenceEngine,
+    "snapshot": SnapshotEngine,
+    "game": GameEngine,
+    "vector": VectorEngine,
+}
+
+
+def random_scenario(rng, max_grid_size=6, max_players=5):
+    # A random board size, player count and starting resources
+    return {
+        "grid_size": int(rng.integers(2, max_grid_size + 1)),
+        "num_players": int(rng.integers(1, max_players + 1)),
+        "starting_resources": {r: int(rng.integers(0, 31)) for r in RESOURCE_TYPES},
+    }
+
+
+def random_action(engine, rng):
+    """
+    Draw the next action of a fuzzed trajectory: mostly legal moves, mixed
+    with arbitrary in-range actions (occupied cells, unaffordable buildings)
+    and out-of-range ones that fall back to ``("Park", 0, 0)``.
+    """
+    env = engine.env
+    num_actions = env.grid_size**2 * env.rules.num_types
+    draw = rng.random()
+    if draw < 0.6:
+        return engine.sample_action(rng)
+    if draw < 0.9:
+        return int(rng.integers(num_actions))
+    return int(rng.choice([-1, -(10**6), num_actions, num_actions + 7, 10**6]))
+
+
+def record_trajectory(scenario, seed, max_steps=None):
+    """
+    Play one seeded trajectory on the reference engine.
+
+    Actions come from ``random_action``; the trajectory stops when the game
+    ends or after ``max_steps`` steps (four per cell by default, since games
+    in which nobody can afford a building never end).
+
+    Returns a dict with the ``scenario``, ``seed``, ``actions`` and one array
+    per field of ``FIELDS``, indexed by step.
+    """
+    rng = np.random.default_rng(seed)
+    engine = ReferenceEngine()
+    engine.reset(scenario)
+    max_steps = max_steps or 4 * scenario["grid_size"] ** 2
+    actions, steps = [], []
+    for _ in range(max_steps):
+        action = random_action(engine, rng)
+        actions.append(action)
+        steps.append(engine.step(action))
+        if steps[-1]["terminated"]:
+            break
+    trajectory = {"scenario": scenario, "seed": seed}
+    trajectory["actions"] = np.array(actions, dtype=np.int64)
+    for field in FIELDS:
+        trajectory[field] = np.array([step[field] for step in steps])
+    return trajectory
+
+
+def replay(trajectory, engine, index=0):
+    """
+    Replay a recorded trajectory's actions on ``engine`` and return the first
+    ``Divergence`` from the recorded steps, or None if every step matches.
+    """
+    engine.reset(trajectory["scenario"])
+    for step, action in enumerate(trajectory["actions"].tolist()):
+        result = engine.step(action)
+        for field in FIELDS:
+            expected = trajectory[field][step]
+            if not np.array_equal(expected, result[field]):
+                return Divergence(
+                    index, step, action, field, expected, np.asarray(result[field])
+                )
+    return None
+
+
+def save_trajectories(path, trajectories):
+    # All trajectories in one .npz file, their scenarios and seeds as JSON
+    arrays = {}
+    for i, trajectory in enumerate(trajectories):
+        for field in ["actions"] + FIELDS:
+            arrays[f"{i}/{field}"] = trajectory[field]
+    header = [{"scenario": t["scenario"], "seed": t["seed"]} for t in trajectories]
+    arrays["header"] = np.array(json.dumps(header))
+    np.savez_compressed(path, **arrays)
+
+
+def load_trajectories(path):
+    with np.load(path) as data:
+        header = json.loads(str(data["header"]))
+        return [
+            {
+                **entry,
+                **{field: data[f"{i}/{field}"] for field in ["actions"] + FIELDS},
+            }
+            for i, entry in enumerate(header)
+        ]
+
+
+def record_golden(count, seed=0, max_grid_size=6, max_players=5):
+    # ``count`` reference trajectories of random scenarios, one seed each
+    rng = np.random.default_rng(seed)
+    return [
+        record_trajectory(random_scenario(rng, max_grid_size, max_players), seed + i)
+        for i in range(count)
+    ]
+
+
+def check(trajectories, engine):
+    # (first divergence, trajectory) of every trajectory that ``engine`` fails
+    # to reproduce
+    failures = []
+    for i, trajectory in enumerate(trajectories):
+        divergence = replay(trajectory, engine, i)
+        if divergence is not None:
+            failures.append((divergence, trajectory))
+    return failures
+
+
+def fuzz(engine, count, seed=0, max_grid_size=6, max_players=5):
+    """
+    Record ``count`` fresh random trajectories and replay each on ``engine``
+    straight away, returning the failures (as ``check``) and the number of
+    steps checked.
+    """
+    rng = np.random.default_rng(seed)
+    failures, steps = [], 0
+    for i in range(count):
+        scenario = random_scenario(rng, max_grid_size, max_players)
+        trajectory = record_trajectory(scenario, [seed, i])
+        steps += len(trajectory["actions"])
+        divergence = replay(trajectory, engine, i)
+        if divergence is not None:
+            failures.append((divergence, trajectory))
+    return failures, steps
+
+
+def report(divergence, trajectory):
+    # One-line description of a divergence, array fields reduced to the
+    # first few differing entries
+    scenario = json.dumps(trajectory["scenario"])
+    expected, actual = np.asarray(divergence.expected), divergence.actual
+    if expected.ndim and expected.shape == actual.shape:
+        where = np.argwhere(expected != actual)[:4]
+        details = ", ".join(
+            f"{i.tolist()}: expected {expected[tuple(i)].tolist()}, "
+            f"got {actual[tuple(i)].tolist()}"
+            for i in where
+        )
+    else:
+        details = f"expected {expected.tolist()}, got {actual.tolist()}"
+    return (
+        f"trajectory {divergence.trajectory} (seed {trajectory['seed']}, {scenario}) "
+        f"diverges at step {divergence.step}, action {divergence.action}, "
+        f"{divergence.field} {details}"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Check engines against reference SimCity trajectories."
+    )
+    parser.add_argument("command", choices=["record", "check", "fuzz"])
+    parser.add_argument(
+        "path", nargs="?", default=GOLDEN_FILE, help="Golden trajectory file (.npz)."
+    )
+    parser.add_argument("--engine", choices=list(ENGINES), default="vector")
+    parser.add_argument("--count", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--max-grid-size", type=int, default=6)
+    parser.add_argument("--max-players", type=int, default=5)
+    args = parser.parse_args()
+
+    if args.command == "record":
+        trajectories = record_golden(
+            args.count, args.seed, args.max_grid_size, args.max_players
+        )
+        save_trajectories(args.path, trajectories)
+        steps = sum(len(t["actions"]) for t in trajectories)
+        print(f"Recorded {len(trajectories)} trajectories ({steps} steps)")
+        return
+
+    engine = ENGINES[args.engine]()
+    if args.command == "check":
+        trajectories = load_trajectories(args.path)
+        failures = check(trajectories, engine)
+        steps = sum(len(t["actions"]) for t in trajectories)
+    else:
+        failures, steps = fuzz(
+            engine, args.count, args.seed, args.max_grid_size, args.max_players
+        )
+    for divergence, trajectory in failures[:10]:
+        print(report(divergence, trajectory))
+    print(
+        f"{args.engine}: {len(failures)} diverging trajectories, "
+        f"{steps} steps checked"
+    )
+    if failures:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
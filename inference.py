@@ -0,0 +1,289 @@
+# inference.py
+import asyncio
+import queue
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from time import monotonic
+import numpy as np
+from config import RESOURCE_TYPES
+from core import SimCityGame
+from players import BasePlayer
+from tournament import game_seed_sequence
+
+
+def stack_observations(observations):
+    """
+    Stack per-agent observations into one batch of arrays for a policy.
+
+    Returns a dict with ``grid`` ``(B, H, W, 3)``, ``builders`` ``(B, H, W)``,
+    ``resources`` ``(B, 2)`` in ``RESOURCE_TYPES`` order and ``action_mask``
+    ``(B, A)``.
+    """
+    return {
+        "grid": np.stack([o["grid"] for o in observations]),
+        "builders": np.stack([o["builders"] for o in observations]),
+        "resources": np.array(
+            [[o["resources"][r] for r in RESOURCE_TYPES] for o in observations],
+            dtype=np.int32,
+        ),
+        "action_mask": np.stack([o["action_mask"] for o in observations]),
+    }
+
+
+def random_policy(seed=None):
+    # Batch policy drawing a uniformly random legal action per observation,
+    # -1 where there is none
+    rng = np.random.default_rng(seed)
+
+    def policy(batch):
+        mask = batch["action_mask"].astype(bool)
+        actions = np.argmax(mask * rng.random(mask.shape), axis=1)
+        return np.where(mask.any(axis=1), actions, -1)
+
+    return policy
+
+
+def _resolve(policy, batch):
+    """
+    Call ``policy`` on a batch of ``(observation, future)`` requests and
+    resolve every future with its action.
+
+    If the policy raises, or returns anything but one action per request,
+    every future gets the exception instead, so no caller waits forever.
+    Returns whether the batch was answered.
+    """
+    try:
+        actions = np.asarray(policy(stack_observations([o for o, _ in batch])))
+        if actions.shape != (len(batch),):
+            raise ValueError(
+                f"policy returned actions of shape {actions.shape} for a batch "
+                f"of {len(batch)} observations"
+            )
+        actions = actions.tolist()
+    except Exception as e:
+        for _, future in batch:
+            if not future.done():
+                future.set_exception(e)
+        return False
+    for (_, future), action in zip(batch, actions):
+        if not future.done():
+            future.set_result(action)
+    return True
+
+
+class InferenceScheduler:
+    """
+    Batches ``select_action`` requests from many threads into single policy calls.
+
+    A background thread waits for the first pending observation, keeps
+    collecting until ``max_batch_size`` observations are pending or
+    ``max_wait`` seconds have passed since the first one, then calls
+    ``policy`` once on the stacked batch and resolves every request. The
+    wait bounds the latency a move can gain from batching.
+
+    Parameters:
+    - policy (callable): Maps a ``stack_observations`` batch to ``(B,)`` actions.
+    - max_batch_size (int): Largest batch passed to the policy.
+    - max_wait (float): Longest time (seconds) a request waits for a batch to fill.
+    """
+
+    def __init__(self, policy, max_batch_size=64, max_wait=0.001):
+        self.policy = policy
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self.batches = 0
+        self.requests = 0
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._serve, daemon=True)
+        self._thread.start()
+
+    def submit(self, observation):
+        # Queue one observation, the returned Future resolves to its action
+        future = Future()
+        self._queue.put((observation, future))
+        return future
+
+    def _serve(self):
+        closing = False
+        while not closing:
+            request = self._queue.get()
+            if request is None:
+                break
+            batch = [request]
+            deadline = monotonic() + self.max_wait
+            while len(batch) < self.max_batch_size:
+                try:
+                    request = self._queue.get(timeout=max(0, deadline - monotonic()))
+                except queue.Empty:
+                    break
+                if request is None:
+                    closing = True
+                    break
+                batch.append(request)
+            self._run(batch)
+
+    def _run(self, batch):
+        if _resolve(self.policy, batch):
+            self.batches += 1
+            self.requests += len(batch)
+
+    def close(self):
+        self._queue.put(None)
+        self._thread.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class AsyncInferenceScheduler:
+    """
+    Asyncio counterpart of ``InferenceScheduler`` for games run as tasks.
+
+    ``act`` queues an observation and awaits its action. A batch is sent to
+    the policy as soon as ``max_batch_size`` observations are pending, or
+    ``max_wait`` seconds after the first one; with ``max_wait=0`` it is sent
+    once every task that was ready to run has submitted its observation.
+    """
+
+    def __init__(self, policy, max_batch_size=64, max_wait=0.0):
+        self.policy = policy
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self.batches = 0
+        self.requests = 0
+        self._pending = []
+        self._timer = None
+
+    async def act(self, observation):
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((observation, future))
+        if len(self._pending) >= self.max_batch_size:
+            self._flush()
+        elif self._timer is None:
+            if self.max_wait > 0:
+                self._timer = loop.call_later(self.max_wait, self._flush)
+            else:
+                self._timer = loop.call_soon(self._flush)
+        return await future
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        while self._pending:
+            batch = self._pending[: self.max_batch_size]
+            del self._pending[: self.max_batch_size]
+            if _resolve(self.policy, batch):
+                self.batches += 1
+                self.requests += len(batch)
+
+
+class BatchedPlayer(BasePlayer):
+    # Player whose actions come from a shared InferenceScheduler
+    def __init__(self, name, scheduler, seed=None):
+        super().__init__(name, seed=seed)
+        self.scheduler = scheduler
+
+    def select_action(self, observation):
+        return self.scheduler.submit(observation).result()
+
+
+def _new_game(seed, game_id, game_kwargs, player_factory):
+    game = SimCityGame(log=False, **game_kwargs)
+    player_seeds = game_seed_sequence(seed, game_id).spawn(len(game.agents))
+    game.players = {
+        agent: player_factory(agent, s) for agent, s in zip(game.agents, player_seeds)
+    }
+    return game
+
+
+def _result(game_id, game):
+    return {
+        "game_id": game_id,
+        "length": game.num_moves,
+        "env_score": float(game.env_score),
+        "integrated_scores": dict(zip(game.agents, game.integrated_scores.tolist())),
+    }
+
+
+def run_games_threaded(
+    n_games,
+    policy,
+    concurrency=64,
+    max_batch_size=64,
+    max_wait=0.001,
+    seed=0,
+    **game_kwargs,
+):
+    """
+    Play ``n_games`` on a pool of ``concurrency`` threads, every player's
+    moves coming from one ``InferenceScheduler`` around ``policy``.
+
+    Returns the per-game results (sorted by game id) and the scheduler.
+    """
+    game_kwargs.setdefault("max_moves", 1000)
+    with InferenceScheduler(policy, max_batch_size, max_wait) as scheduler:
+
+        def play(game_id):
+            game = _new_game(
+                seed,
+                game_id,
+                game_kwargs,
+                lambda agent, s: BatchedPlayer(agent, scheduler, seed=s),
+            )
+            game.run_game()
+            return _result(game_id, game)
+
+        with ThreadPoolExecutor(concurrency) as pool:
+            results = list(pool.map(play, range(n_games)))
+    return results, scheduler
+
+
+async def _play_async(game_id, game, scheduler):
+    # Drive the game's turn generator, awaiting each action from the scheduler
+    turns = game.turns()
+    try:
+        agent_id, observation = next(turns)
+        while True:
+            action = await scheduler.act(observation)
+            agent_id, observation = turns.send(action)
+    except StopIteration:
+        pass
+    return _result(game_id, game)
+
+
+def run_games_async(
+    n_games,
+    policy,
+    concurrency=64,
+    max_batch_size=64,
+    max_wait=0.0,
+    seed=0,
+    **game_kwargs,
+):
+    """
+    Play ``n_games`` as asyncio tasks, at most ``concurrency`` at a time, every
+    move coming from one ``AsyncInferenceScheduler`` around ``policy``.
+
+    Returns the per-game results (sorted by game id) and the scheduler.
+    """
+    game_kwargs.setdefault("max_moves", 1000)
+    scheduler = AsyncInferenceScheduler(policy, max_batch_size, max_wait)
+
+    async def main():
+        limit = asyncio.Semaphore(concurrency)
+
+        async def play(game_id):
+            async with limit:
+                game = _new_game(
+                    seed, game_id, game_kwargs, lambda agent, s: BasePlayer(agent, s)
+                )
+                return await _play_async(game_id, game, scheduler)
+
+        return await asyncio.gather(*(play(i) for i in range(n_games)))
+
+    return list(asyncio.run(main())), scheduler
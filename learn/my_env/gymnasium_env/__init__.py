@@ -3,4 +3,5 @@ from gymnasium.envs.registration import register
 register(
     id="gymnasium_env/GridWorld-v0",
     entry_point="gymnasium_env.envs:GridWorldEnv",
+    vector_entry_point="gymnasium_env.envs:GridWorldVectorEnv",
 )
@@ -1 +1,2 @@
 from gymnasium_env.envs.grid_world import GridWorldEnv
+from gymnasium_env.envs.grid_world_vector import GridWorldVectorEnv
@@ -0,0 +1,105 @@
+import numpy as np
+from gymnasium import spaces
+from gymnasium.vector import VectorEnv
+from gymnasium.vector.utils import batch_space
+
+from gymnasium_env.envs.grid_world import Actions
+
+
+class GridWorldVectorEnv(VectorEnv):
+    """
+    `num_envs` copies of `GridWorldEnv` stepped together with array operations.
+
+    Observations are the batched version of `GridWorldEnv`'s, i.e. a dict with
+    `(num_envs, 2)` "agent" and "target" arrays, and the info holds the L1
+    "distance" of every copy. Copies that finish are reset on their next step,
+    like `SyncVectorEnv` does: that step ignores their action and returns the
+    first observation of the new episode with zero reward.
+    """
+
+    metadata = {"render_modes": []}
+
+    def __init__(self, num_envs=1, size=5, render_mode=None):
+        assert render_mode is None, "GridWorldVectorEnv does not render"
+        self.num_envs = num_envs
+        self.size = size  # The size of the square grid
+        self.render_mode = render_mode
+
+        self.single_observation_space = spaces.Dict(
+            {
+                "agent": spaces.Box(0, size - 1, shape=(2,), dtype=int),
+                "target": spaces.Box(0, size - 1, shape=(2,), dtype=int),
+            }
+        )
+        self.observation_space = batch_space(self.single_observation_space, num_envs)
+        self.single_action_space = spaces.Discrete(4)
+        self.action_space = batch_space(self.single_action_space, num_envs)
+
+        # Row `action` of this table is the direction that action walks in
+        self._action_to_direction = np.zeros((4, 2), dtype=int)
+        self._action_to_direction[Actions.right.value] = [1, 0]
+        self._action_to_direction[Actions.up.value] = [0, 1]
+        self._action_to_direction[Actions.left.value] = [-1, 0]
+        self._action_to_direction[Actions.down.value] = [0, -1]
+
+        self._agent_location = np.zeros((num_envs, 2), dtype=int)
+        self._target_location = np.zeros((num_envs, 2), dtype=int)
+        # Copies whose episode ended on the last step and reset on the next one
+        self._autoreset = np.zeros(num_envs, dtype=bool)
+
+    def _get_obs(self):
+        return {
+            "agent": self._agent_location.copy(),
+            "target": self._target_location.copy(),
+        }
+
+    def _get_info(self):
+        distance = np.abs(self._agent_location - self._target_location).sum(axis=1)
+        return {
+            "distance": distance.astype(float),
+            "_distance": np.ones(self.num_envs, dtype=bool),
+        }
+
+    def _reset_envs(self, mask):
+        # Place the agent and target of the copies in `mask` uniformly at
+        # random on distinct cells, without rejection sampling: the target is
+        # drawn from the size * size - 1 cells left after the agent's
+        n = int(np.count_nonzero(mask))
+        cells = self.size * self.size
+        agent = self.np_random.integers(0, cells, size=n)
+        target = self.np_random.integers(0, cells - 1, size=n)
+        target += target >= agent
+        self._agent_location[mask] = np.stack(np.divmod(agent, self.size), axis=1)
+        self._target_location[mask] = np.stack(np.divmod(target, self.size), axis=1)
+
+    def reset(self, seed=None, options=None):
+        # Seeds self.np_random, which every copy draws from
+        super().reset(seed=seed)
+        self._reset_envs(np.ones(self.num_envs, dtype=bool))
+        self._autoreset[:] = False
+        return self._get_obs(), self._get_info()
+
+    def step(self, actions):
+        actions = np.asarray(actions)
+        # Walk every copy, using `np.clip` to stay on the grid
+        np.clip(
+            self._agent_location + self._action_to_direction[actions],
+            0,
+            self.size - 1,
+            out=self._agent_location,
+        )
+        # An episode is done iff the agent has reached the target
+        terminated = np.all(self._agent_location == self._target_location, axis=1)
+        # Binary sparse rewards
+        reward = terminated.astype(int)
+
+        # Copies that finished on the previous step start a new episode instead
+        reset = self._autoreset
+        if reset.any():
+            self._reset_envs(reset)
+            terminated[reset] = False
+            reward[reset] = 0
+        self._autoreset = terminated.copy()
+
+        truncated = np.zeros(self.num_envs, dtype=bool)
+        return self._get_obs(), reward, terminated, truncated, self._get_info()
@@ -0,0 +1,4 @@
+from gymnasium_env.wrappers.vector.clip_reward import ClipReward
+from gymnasium_env.wrappers.vector.discrete_actions import DiscreteActions
+from gymnasium_env.wrappers.vector.reacher_weighted_reward import ReacherRewardWrapper
+from gymnasium_env.wrappers.vector.relative_position import RelativePosition
@@ -0,0 +1,16 @@
+import numpy as np
+from gymnasium.spaces import Discrete
+from gymnasium.vector import VectorActionWrapper
+from gymnasium.vector.utils import batch_space
+
+
+class DiscreteActions(VectorActionWrapper):
+    def __init__(self, env, disc_to_cont):
+        super().__init__(env)
+        # Row i is the continuous action of discrete action i
+        self.disc_to_cont = np.asarray(disc_to_cont)
+        self.single_action_space = Discrete(len(disc_to_cont))
+        self.action_space = batch_space(self.single_action_space, env.num_envs)
+
+    def actions(self, actions):
+        return self.disc_to_cont[np.asarray(actions)]
@@ -0,0 +1,16 @@
+from gymnasium.vector import VectorWrapper
+
+
+class ReacherRewardWrapper(VectorWrapper):
+    def __init__(self, env, reward_dist_weight, reward_ctrl_weight):
+        super().__init__(env)
+        self.reward_dist_weight = reward_dist_weight
+        self.reward_ctrl_weight = reward_ctrl_weight
+
+    def step(self, actions):
+        obs, _, terminated, truncated, info = self.env.step(actions)
+        reward = (
+            self.reward_dist_weight * info["reward_dist"]
+            + self.reward_ctrl_weight * info["reward_ctrl"]
+        )
+        return obs, reward, terminated, truncated, info
@@ -1,39 +1,61 @@
 # log.py
 
+import json
 import logging
 import os
+import time
+from collections.abc import Mapping
+import numpy as np
+from config import BUILDING_TYPES, RESOURCE_TYPES
 
-# Setup logging
 LOG_FILE = "game_log.txt"
+LOG_DATE_FORMAT = "%Y-%m-%d %H:%M:%S"
 
-# Clear the log file at the start of the run
-if os.path.exists(LOG_FILE):
-    with open(LOG_FILE, "w") as f:
-        f.truncate(0)
+_logging_ready = False
 
-logging.basicConfig(
-    filename=LOG_FILE,
-    level=logging.INFO,
-    format="%(asctime)s - %(message)s",
-    filemode="a",  # Append mode
-    datefmt="%Y-%m-%d %H:%M:%S",
-)
 
+def setup_logging(log_file=LOG_FILE):
+    """
+    Clear the log file and send log records to it, once per process.
 
-def display_current_turn(turn, agent_name):
-    logging.info(f"Current Turn: {turn}, Agent: {agent_name}")
+    Nothing is written or configured at import time, so processes that never
+    log (e.g. tournament workers) leave the log file alone.
+    """
+    global _logging_ready
+    if _logging_ready:
+        return
+    # Clear the log file at the start of the run
+    if os.path.exists(log_file):
+        with open(log_file, "w") as f:
+            f.truncate(0)
+
+    logging.basicConfig(
+        filename=log_file,
+        level=logging.INFO,
+        format="%(asctime)s - %(message)s",
+        filemode="a",  # Append mode
+        datefmt=LOG_DATE_FORMAT,
+    )
+    _logging_ready = True
 
 
-def display_board(buildings, grid_scores, builders, agents):
+def format_current_turn(turn, agent_name):
+    return f"Current Turn: {turn}, Agent: {agent_name}"
+
+
+def format_board(buildings, grid_scores, builders, agents, building_types=None):
     """
-    Logs the detailed board state with uniform formatting.
+    Formats the detailed board state with uniform formatting.
 
     Parameters:
-    - buildings (np.array): Grid of building types (or dictionaries containing building info).
+    - buildings (np.array): Grid of building type indices (-1 for empty cells).
     - grid_scores (np.array): Grid of G, V, D scores.
     - builders (np.array): Grid of builder indices.
     - agents (list): List of agent names.
+    - building_types (list): Building names by type index, defaults to BUILDING_TYPES.
     """
+    if building_types is None:
+        building_types = BUILDING_TYPES
     log_message = "Current Board State:\n"
     cell_width = 24  # Fixed width for each cell
     separator = ", "  # Separator between cells
@@ -44,10 +66,10 @@ def display_board(buildings, grid_scores, builders, agents):
             building = buildings[x][y]
             G, V, D = grid_scores[x][y]
             builder_idx = builders[x][y]
-            if building is None:
+            if building < 0:
                 cell_content = f"[X|G:{G}|V:{V}|D:{D}|B:NA]"
             else:
-                building_type = building["type"]  # Extract building type
+                building_type = building_types[building]
                 builder_name = agents[builder_idx] if builder_idx != -1 else "None"
                 # Truncate builder name if it's too long
                 builder_name = (
@@ -63,26 +85,57 @@ def display_board(buildings, grid_scores, builders, agents):
         row_str = separator.join(row_cells)
         log_message += row_str + "\n"
     log_message += "\n"
-    logging.info(log_message)
+    return log_message
 
 
-def display_player_stats(players):
+def format_player_stats(stats):
+    """
+    Formats player statistics.
+
+    Parameters:
+    - stats (iterable): ``(name, self_score, integrated_score, resources)`` per
+      player, ``resources`` is a mapping or None when unavailable.
+    """
     log_message = "Player Statistics:\n"
-    for player in players.values():
-        log_message += f"{player.name}:\n"
-        log_message += f"  Self Score: {player.self_score}\n"
-        log_message += f"  Integrated Score: {player.integrated_score}\n"
+    for name, self_score, integrated_score, resources in stats:
+        log_message += f"{name}:\n"
+        log_message += f"  Self Score: {self_score}\n"
+        log_message += f"  Integrated Score: {integrated_score}\n"
 
-        if hasattr(player, "resources") and isinstance(player.resources, dict):
+        if resources is not None:
             log_message += "  Resources:\n"
-            for resource, value in player.resources.items():
+            for resource, value in resources.items():
                 log_message += f"    {resource.capitalize():<12}: {value}\n"
         else:
             log_message += "  Resources: N/A\n"
 
         log_message += "\n"
+    return log_message
+
 
-    logging.info(log_message)
+def display_current_turn(turn, agent_name):
+    logging.info(format_current_turn(turn, agent_name))
+
+
+def display_board(buildings, grid_scores, builders, agents, building_types=None):
+    """
+    Logs the detailed board state with uniform formatting.
+
+    Parameters are the same as for ``format_board``.
+    """
+    logging.info(format_board(buildings, grid_scores, builders, agents, building_types))
+
+
+def display_player_stats(players):
+    stats = []
+    for player in players.values():
+        resources = getattr(player, "resources", None)
+        if not isinstance(resources, Mapping):
+            resources = None
+        stats.append(
+            (player.name, player.self_score, player.integrated_score, resources)
+        )
+    logging.info(format_player_stats(stats))
 
 
 def log_environment_score(env_score):
@@ -91,3 +144,189 @@ def log_environment_score(env_score):
     """
     logging.info(f"Environment Score {env_score}")
     logging.info(f"----------------------------------------\n")
+
+
+TRAJECTORY_MAGIC = b"SIMCITY-TRAJ-1\n"
+
+
+def trajectory_dtype(state_dtype):
+    # One fixed-size record per turn: turn metadata plus a copy of env.state
+    return np.dtype(
+        [
+            ("time", np.float64),
+            ("turn", np.int32),
+            ("agent", np.int8),
+            ("log_agent", np.int8),
+            ("start", np.bool_),
+            ("action", np.int32),
+            ("env_score", np.float64),
+            ("state", state_dtype),
+        ]
+    )
+
+
+class TrajectoryRecorder:
+    """
+    Records raw per-turn game arrays into a compact binary trajectory file.
+
+    Each turn copies ``env.state`` (grid, buildings, builders, resources and
+    scores) plus the acting agent, action and env score into a preallocated
+    ring buffer of ``capacity`` records, which is written to ``path`` in bulk
+    whenever it fills up, on ``flush`` and on ``close``. The file starts with
+    ``TRAJECTORY_MAGIC``, a 4-byte header length and a JSON header describing
+    the game and record layout, followed by the fixed-size records.
+    ``render_trajectory`` turns it back into the text log on demand.
+
+    Parameters:
+    - path (str): Output file, overwritten.
+    - env (SimCityEnv): Env whose turns are recorded.
+    - capacity (int): Records buffered in memory between writes.
+    """
+
+    def __init__(self, path, env, capacity=4096):
+        self.path = path
+        self.dtype = trajectory_dtype(env.state.dtype)
+        self.buffer = np.zeros(capacity, dtype=self.dtype)
+        # Column views, assigning to these is much cheaper than to record fields
+        self._times = self.buffer["time"]
+        self._turns = self.buffer["turn"]
+        self._agents = self.buffer["agent"]
+        self._log_agents = self.buffer["log_agent"]
+        self._starts = self.buffer["start"]
+        self._actions = self.buffer["action"]
+        self._env_scores = self.buffer["env_score"]
+        self._states = self.buffer["state"]
+        self.size = 0
+        header = json.dumps(
+            {
+                "grid_size": env.grid_size,
+                "agents": list(env.agents),
+                "building_types": list(env.rules.building_types),
+                "resource_types": RESOURCE_TYPES,
+                "dtype": np.lib.format.dtype_to_descr(self.dtype),
+            }
+        ).encode()
+        self.file = open(path, "wb")
+        self.file.write(TRAJECTORY_MAGIC)
+        self.file.write(len(header).to_bytes(4, "little"))
+        self.file.write(header)
+
+    def record(self, env, agent_idx, action, start=False):
+        # Copy the env's current state into the next slot of the ring buffer.
+        # ``start`` marks the state before the first move of run_game, and
+        # the agent run_game asks for the move is kept for the log's header
+        i = self.size
+        self._times[i] = time.time()
+        self._turns[i] = env.num_moves
+        self._agents[i] = agent_idx
+        self._log_agents[i] = env.agent_index
+        self._starts[i] = start
+        # Actions the env decodes to the default action are stored as -1
+        valid = isinstance(action, int) and 0 <= action < 2**31
+        self._actions[i] = action if valid else -1
+        self._env_scores[i] = env.env_score
+        self._states[i] = env.state
+        self.size = i + 1
+        if self.size == len(self.buffer):
+            self.flush()
+
+    def flush(self):
+        self.file.write(self.buffer[: self.size].tobytes())
+        self.file.flush()
+        self.size = 0
+
+    def close(self):
+        if not self.file.closed:
+            self.flush()
+            self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def read_trajectory(path):
+    """
+    Memory-map a trajectory file.
+
+    Returns:
+    - header (dict): Game description written by the recorder.
+    - records (np.array): Structured array of ``trajectory_dtype`` records.
+    """
+    with open(path, "rb") as f:
+        if f.read(len(TRAJECTORY_MAGIC)) != TRAJECTORY_MAGIC:
+            raise ValueError(f"{path} is not a trajectory file")
+        header_size = int.from_bytes(f.read(4), "little")
+        header = json.loads(f.read(header_size))
+    offset = len(TRAJECTORY_MAGIC) + 4 + header_size
+    dtype = np.lib.format.descr_to_dtype([tuple(field) for field in header["dtype"]])
+    if os.path.getsize(path) == offset:
+        return header, np.zeros(0, dtype=dtype)
+    return header, np.memmap(path, dtype=dtype, mode="r", offset=offset)
+
+
+def _environment_scores(grid):
+    # The dict SimCityGame.calculate_environment_score logs, from a G/V/D grid
+    G_avg, V_avg, D_avg = grid.sum(axis=(0, 1), dtype=np.int64) / (
+        grid.shape[0] * grid.shape[1]
+    )
+    env_score = (1 / 3) * G_avg + (1 / 3) * V_avg + (1 / 3) * D_avg
+    return {"G_avg": G_avg, "V_avg": V_avg, "D_avg": D_avg, "env_score": env_score}
+
+
+def iter_rendered_trajectory(path):
+    """
+    Yield the text log lines of a trajectory file, one turn at a time.
+
+    The lines are those the live logger writes during ``run_game``, timestamps
+    aside: after every move the env score logged by ``step``, then the turn
+    header naming the agent ``run_game`` asked for the move, the board, the
+    player statistics (integrated scores print as ``0`` until a player first
+    moves, as the players' own scores do) and the env score breakdown.
+    """
+    header, records = read_trajectory(path)
+    agents = header["agents"]
+    resource_types = header["resource_types"]
+    separator = "----------------------------------------\n"
+    moved = [False] * len(agents)
+    for record in records:
+        stamp = time.strftime(LOG_DATE_FORMAT, time.localtime(record["time"]))
+        state = record["state"]
+        start = bool(record["start"])
+        messages = []
+        if not start:
+            moved[record["agent"]] = True
+            messages += [f"Environment Score {float(record['env_score'])}", separator]
+        stats = [
+            (
+                name,
+                int(state["self_scores"][i]),
+                (float if moved[i] else int)(state["integrated_scores"][i]),
+                dict(zip(resource_types, state["resources"][i].tolist())),
+            )
+            for i, name in enumerate(agents)
+        ]
+        messages += [
+            format_current_turn(int(record["turn"]), agents[record["log_agent"]]),
+            format_board(
+                state["buildings"],
+                state["grid"],
+                state["builders"],
+                agents,
+                header["building_types"],
+            ),
+            format_player_stats(stats),
+        ]
+        if not start:
+            scores = _environment_scores(state["grid"])
+            messages += [f"Environment Score {scores}", separator]
+        for message in messages:
+            yield f"{stamp} - {message}\n"
+
+
+def render_trajectory(path, out_path):
+    # Write the human-readable text log of a trajectory file
+    with open(out_path, "w") as f:
+        f.writelines(iter_rendered_trajectory(path))
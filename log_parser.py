@@ -0,0 +1,294 @@
+# log_parser.py
+import argparse
+import json
+import os
+import time
+from collections import namedtuple
+import numpy as np
+from config import BUILDING_TYPES, RESOURCE_TYPES
+
+# One logged turn. Arrays are indexed like the board (rows, columns) and, for
+# per-player fields, like ``agents``; builders are indices into ``agents``
+TurnRecord = namedtuple(
+    "TurnRecord",
+    [
+        "time",
+        "turn",
+        "agent",
+        "agents",
+        "buildings",
+        "grid",
+        "builders",
+        "self_scores",
+        "integrated_scores",
+        "resources",
+        "env_score",
+    ],
+)
+
+_SEPARATOR = " - "
+
+
+def _parse_env_score(message):
+    # "Environment Score 28.75", or the dict logged by run_game whose values
+    # may be numpy scalar reprs such as "np.float64(28.75)"
+    value = message[len("Environment Score ") :]
+    if value.startswith("{"):
+        value = value[value.index("'env_score': ") + len("'env_score': ") :]
+        value = value.rstrip("})")
+        if value.startswith("np.float64("):
+            value = value[len("np.float64(") :]
+    return float(value)
+
+
+def _parse_board_row(line, letters):
+    # "[H|G:0|V:30|D:60|B:P2]  , [X|G:30|...]" -> building, G, V, D, builder name
+    row = []
+    for cell in line.split("]")[:-1]:
+        fields = cell[cell.index("[") + 1 :].split("|")
+        builder = fields[4][2:]
+        row.append(
+            (
+                letters[fields[0]],
+                int(fields[1][2:]),
+                int(fields[2][2:]),
+                int(fields[3][2:]),
+                None if builder in ("NA", "None") else builder,
+            )
+        )
+    return row
+
+
+def _board_env_score(board):
+    # Env score of parsed board rows, computed as SimCityGame._environment_score
+    cells = [cell for row in board for cell in row]
+    G_sum, V_sum, D_sum = (sum(cell[i] for cell in cells) for i in (1, 2, 3))
+    return (
+        (1 / 3) * (G_sum / len(cells))
+        + (1 / 3) * (V_sum / len(cells))
+        + (1 / 3) * (D_sum / len(cells))
+    )
+
+
+def _turn_env_score(board, env_score):
+    # The logged score of a turn, or the score of its board when the turn has
+    # none of its own (the initial turn of a live run_game log)
+    return _board_env_score(board) if env_score is None else env_score
+
+
+def iter_log_records(path, building_types=None):
+    """
+    Stream the turns of a text game log as ``TurnRecord`` tuples.
+
+    The log is read line by line, so memory use does not grow with the file.
+    Both the live log written during ``run_game`` and logs rendered from
+    trajectory files are understood. A turn's env score is the first score
+    logged after its player statistics that agrees with its board: in live
+    logs ``step`` also logs the score after every move, and the initial turn
+    has no score of its own, so its score is computed from its board.
+
+    Parameters:
+    - path (str): Text log, as written by log.py.
+    - building_types (list): Building names by type index, defaults to
+      BUILDING_TYPES; the log only keeps their first letters.
+    """
+    building_types = building_types or BUILDING_TYPES
+    letters = {"X": -1}
+    for i, name in enumerate(building_types):
+        if name[0] in letters:
+            raise ValueError(f"Building types share the log letter {name[0]!r}")
+        letters[name[0]] = i
+    resource_names = {r.capitalize(): i for i, r in enumerate(RESOURCE_TYPES)}
+    stamps = {}
+
+    turn = stamp = section = env_score = None
+    board, players = [], {}
+    with open(path) as f:
+        for line in f:
+            head, sep, message = line.partition(_SEPARATOR)
+            if sep and head[:1].isdigit():
+                message = message.rstrip("\n")
+                if message.startswith("Current Turn: "):
+                    if turn is not None and board and players:
+                        env_score = _turn_env_score(board, env_score)
+                        yield _make_record(turn, stamp, board, players, env_score)
+                    turn_text, _, agent_text = message.partition(", Agent: ")
+                    turn = (int(turn_text[len("Current Turn: ") :]), agent_text)
+                    if head not in stamps:
+                        stamps[head] = time.mktime(
+                            time.strptime(head, "%Y-%m-%d %H:%M:%S")
+                        )
+                    stamp = stamps[head]
+                    board, players, env_score = [], {}, None
+                    section = None
+                elif message.startswith("Current Board State:"):
+                    section = "board"
+                elif message.startswith("Player Statistics:"):
+                    section = "players"
+                elif message.startswith("Environment Score "):
+                    if turn is not None and section in ("players", "scores"):
+                        # Skip scores logged by step after the next move
+                        score = _parse_env_score(message)
+                        if np.isclose(score, _board_env_score(board)):
+                            env_score = score
+                            section = None
+                        else:
+                            section = "scores"
+                    else:
+                        section = None
+                continue
+            if turn is None or section in (None, "scores"):
+                continue
+            stripped = line.strip()
+            if not stripped:
+                continue
+            if section == "board":
+                board.append(_parse_board_row(stripped, letters))
+            elif not line.startswith(" "):
+                player = [0, 0.0, [0] * len(RESOURCE_TYPES)]
+                players[stripped.rstrip(":")] = player
+            elif stripped.startswith("Self Score: "):
+                player[0] = int(stripped[len("Self Score: ") :])
+            elif stripped.startswith("Integrated Score: "):
+                player[1] = float(stripped[len("Integrated Score: ") :])
+            elif ":" in stripped and not stripped.startswith("Resources"):
+                name, _, value = stripped.partition(":")
+                player[2][resource_names[name.strip()]] = int(value)
+    if turn is not None and env_score is not None:
+        yield _make_record(turn, stamp, board, players, env_score)
+
+
+def _make_record(turn, stamp, board, players, env_score):
+    agents = list(players)
+    agent_ids = {agent[:4]: i for i, agent in enumerate(agents)}
+    cells = np.array(
+        [[cell[:4] for cell in row] for row in board], dtype=np.int32
+    ).reshape(len(board), -1, 4)
+    builders = np.array(
+        [
+            [-1 if cell[4] is None else agent_ids[cell[4]] for cell in row]
+            for row in board
+        ],
+        dtype=np.int8,
+    )
+    stats = list(players.values())
+    return TurnRecord(
+        time=stamp,
+        turn=turn[0],
+        agent=turn[1],
+        agents=agents,
+        buildings=cells[..., 0].astype(np.int8),
+        grid=np.ascontiguousarray(cells[..., 1:]),
+        builders=builders,
+        self_scores=np.array([s[0] for s in stats], dtype=np.int64),
+        integrated_scores=np.array([s[1] for s in stats], dtype=np.float64),
+        resources=np.array([s[2] for s in stats], dtype=np.int32),
+        env_score=env_score,
+    )
+
+
+SCALAR_DTYPES = {
+    "time": np.float64,
+    "turn": np.int32,
+    "agent": np.int8,
+    "env_score": np.float64,
+}
+
+
+def _record_fields(record):
+    # Column values of one record, with the agent as its index
+    fields = record._asdict()
+    fields["agent"] = record.agents.index(record.agent)
+    del fields["agents"]
+    return fields
+
+
+def convert_log(path, out_dir, building_types=None, capacity=4096):
+    """
+    Convert a text game log into one raw fixed-dtype file per field in
+    ``out_dir`` plus ``meta.json``, streaming in chunks of ``capacity`` turns.
+
+    Returns the number of turns written. ``load_columns`` memory-maps the result.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    buffers = files = agents = None
+    size = rows = 0
+    for record in iter_log_records(path, building_types):
+        fields = _record_fields(record)
+        if buffers is None:
+            agents = record.agents
+            buffers = {
+                name: np.zeros(
+                    (capacity,) + np.shape(value),
+                    dtype=SCALAR_DTYPES.get(name, np.asarray(value).dtype),
+                )
+                for name, value in fields.items()
+            }
+            files = {
+                name: open(os.path.join(out_dir, f"{name}.bin"), "wb")
+                for name in buffers
+            }
+        for name, value in fields.items():
+            buffers[name][size] = value
+        size += 1
+        if size == capacity:
+            for name, f in files.items():
+                f.write(buffers[name].tobytes())
+            rows, size = rows + size, 0
+
+    meta = {"rows": 0, "columns": {}}
+    if buffers is not None:
+        for name, f in files.items():
+            f.write(buffers[name][:size].tobytes())
+            f.close()
+        rows += size
+        meta = {
+            "rows": rows,
+            "agents": agents,
+            "building_types": list(building_types or BUILDING_TYPES),
+            "resource_types": RESOURCE_TYPES,
+            "columns": {
+                name: {"dtype": buffer.dtype.str, "shape": list(buffer.shape[1:])}
+                for name, buffer in buffers.items()
+            },
+        }
+    with open(os.path.join(out_dir, "meta.json"), "w") as f:
+        json.dump(meta, f, indent=2)
+    return rows
+
+
+def load_columns(out_dir):
+    # Memory-map the columns written by convert_log
+    with open(os.path.join(out_dir, "meta.json")) as f:
+        meta = json.load(f)
+    columns = {}
+    for name, column in meta["columns"].items():
+        shape = (meta["rows"],) + tuple(column["shape"])
+        if meta["rows"]:
+            columns[name] = np.memmap(
+                os.path.join(out_dir, f"{name}.bin"),
+                dtype=np.dtype(column["dtype"]),
+                mode="r",
+                shape=shape,
+            )
+        else:
+            columns[name] = np.zeros(shape, dtype=np.dtype(column["dtype"]))
+    return meta, columns
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Convert text game logs to columns.")
+    parser.add_argument("logs", nargs="+")
+    parser.add_argument("--out", required=True, help="Output directory.")
+    args = parser.parse_args()
+    for path in args.logs:
+        out_dir = args.out
+        if len(args.logs) > 1:
+            name = os.path.splitext(os.path.basename(path))[0]
+            out_dir = os.path.join(args.out, name)
+        rows = convert_log(path, out_dir)
+        print(f"{path}: {rows} turns -> {out_dir}")
+
+
+if __name__ == "__main__":
+    main()
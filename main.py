@@ -1,8 +1,10 @@
 # main.py
 
-import logging
 from environment import SimCityEnv
 from players import BalancedPlayer
+from log import TrajectoryRecorder, render_trajectory
+
+TRAJECTORY_FILE = "game_log.bin"
 
 
 def main():
@@ -12,11 +14,16 @@ def main():
         "P3": BalancedPlayer("P3"),
     }
 
-    env = SimCityEnv()
+    env = SimCityEnv(log=False)
 
     env.players = players
 
-    env.run_game()
+    # Record raw turns while playing, the text log is rendered afterwards
+    with TrajectoryRecorder(TRAJECTORY_FILE, env) as recorder:
+        env.recorder = recorder
+        env.run_game()
+
+    render_trajectory(TRAJECTORY_FILE, "game_log.txt")
 
     print("Game Over!")
 
@@ -0,0 +1,262 @@
+# mcts.py
+import math
+from collections import OrderedDict
+from time import perf_counter
+import numpy as np
+from core import SimCityGame
+from players import BasePlayer
+from symmetry import Canonicalizer
+from vector_env import VectorSimCityEnv
+
+ZOBRIST_SEED = 0x5C17
+
+
+class _Node:
+    # Search statistics of one position, children are indexed like ``actions``
+    __slots__ = ("actions", "visits", "child_visits", "child_values", "expanded")
+
+    def __init__(self, actions, n_agents):
+        self.actions = actions
+        self.visits = 0
+        self.child_visits = np.zeros(len(actions), dtype=np.int64)
+        self.child_values = np.zeros((len(actions), n_agents))
+        self.expanded = 0  # Children tried so far, in ``actions`` order
+
+
+class TranspositionTable:
+    """
+    Bounded position -> ``_Node`` map with least-recently-used eviction.
+    """
+
+    def __init__(self, max_nodes):
+        self.max_nodes = max_nodes
+        self.nodes = OrderedDict()
+
+    def get(self, key):
+        node = self.nodes.get(key)
+        if node is not None:
+            self.nodes.move_to_end(key)
+        return node
+
+    def put(self, key, node):
+        self.nodes[key] = node
+        if len(self.nodes) > self.max_nodes:
+            self.nodes.popitem(last=False)
+
+    def __len__(self):
+        return len(self.nodes)
+
+
+class MCTSPlayer(BasePlayer):
+    """
+    Monte Carlo Tree Search over the game the player is bound to.
+
+    Every agent in the tree picks the move that maximizes its own integrated
+    score (max^n), with children chosen by UCT on values normalized to the
+    range seen so far. Positions are keyed by a Zobrist hash of the board,
+    updated incrementally along each simulation, together with the agent to
+    move and the resources, and their statistics are kept in a bounded
+    transposition table with LRU eviction that persists across moves. Each
+    new leaf is evaluated by ``rollouts`` uniformly random legal playouts
+    stepped together in a ``VectorSimCityEnv``.
+
+    The search only reads the bound game through ``snapshot`` and plays on a
+    private copy, so it never logs, records or counts metrics.
+
+    Parameters:
+    - name (str): Agent name.
+    - seed (int): Seed of the player's random generator.
+    - time_budget (float): Seconds of search per move, None for no limit.
+    - iterations (int): Simulations per move, None for no limit.
+    - rollouts (int): Random playouts per new leaf, stepped as one batch.
+    - rollout_depth (int): Move limit of a playout, defaults to the number of cells.
+    - exploration (float): UCT exploration constant.
+    - max_nodes (int): Transposition table capacity.
+    - eval_cache (symmetry.EvaluationCache): Optional cache of leaf evaluations
+      keyed by the canonical form of the position, may be shared by players.
+    """
+
+    def __init__(
+        self,
+        name,
+        seed=None,
+        time_budget=0.05,
+        iterations=None,
+        rollouts=16,
+        rollout_depth=None,
+        exploration=1.4,
+        max_nodes=100_000,
+        eval_cache=None,
+    ):
+        super().__init__(name, seed=seed)
+        if time_budget is None and iterations is None:
+            raise ValueError("MCTSPlayer needs a time_budget or an iterations limit")
+        self.time_budget = time_budget
+        self.iterations = iterations
+        self.rollouts = rollouts
+        self.rollout_depth = rollout_depth
+        self.exploration = exploration
+        self.table = TranspositionTable(max_nodes)
+        self.eval_cache = eval_cache
+        self._sim = None
+
+    def _setup(self, game):
+        # Private copy of the game and the rollout engine, built on first use;
+        # the move limit sets the state layout, so it must match the game's
+        self._sim = SimCityGame(
+            grid_size=game.grid_size,
+            num_players=len(game.agents),
+            rules=game.rules,
+            log=False,
+            max_moves=game.max_moves,
+        )
+        self._sim.players = {agent: BasePlayer(agent) for agent in game.agents}
+        self._rollout_env = VectorSimCityEnv(
+            self.rollouts,
+            grid_size=game.grid_size,
+            n_agents=len(game.agents),
+            rules=game.rules,
+        )
+        cells, n_agents = game.grid_size**2, len(game.agents)
+        keys = np.random.default_rng(ZOBRIST_SEED).integers(
+            0,
+            2**63,
+            size=(cells * game.rules.num_types * n_agents + n_agents),
+            dtype=np.uint64,
+        )
+        # One key per (cell, type, builder) and one per agent to move
+        self._piece_keys = keys[:-n_agents].reshape(
+            cells, game.rules.num_types, n_agents
+        )
+        self._mover_keys = keys[-n_agents:]
+        self._depth = self.rollout_depth or cells
+        self._canonicalizer = Canonicalizer(game.grid_size, game.rules)
+
+    def _board_hash(self, game):
+        cells = np.flatnonzero(game.buildings.ravel() >= 0)
+        pieces = self._piece_keys[
+            cells, game.buildings.ravel()[cells], game.builders.ravel()[cells]
+        ]
+        return int(np.bitwise_xor.reduce(pieces, initial=np.uint64(0)))
+
+    def _key(self, board_hash, game):
+        mover = game.agents.index(game.agent_selection)
+        return (board_hash ^ int(self._mover_keys[mover]), game.resources.tobytes())
+
+    def _legal_actions(self, game):
+        actions = np.flatnonzero(game.action_mask(game.agent_selection))
+        self.rng.shuffle(actions)
+        return actions
+
+    def select_action(self, observation):
+        game = self.game
+        if game is None:
+            raise RuntimeError("MCTSPlayer must be bound to a game via env.players")
+        if self._sim is None or self._sim.state.dtype != game.state.dtype:
+            self._setup(game)
+        sim = self._sim
+        root = game.snapshot()
+        sim.restore(root)
+        n = len(game.agents)
+        # run_game asks agent_index for the move of agent_selection, so the
+        # agent choosing at a node is offset from the agent to move
+        mover = game.agents.index(game.agent_selection)
+        offset = (mover - game.agents.index(self.name)) % n
+        root_hash = self._board_hash(sim)
+        root_key = self._key(root_hash, sim)
+        root_node = self.table.get(root_key)
+        if root_node is None:
+            root_node = _Node(self._legal_actions(sim), n)
+            self.table.put(root_key, root_node)
+        if not len(root_node.actions):
+            return -1
+
+        self._low, self._high = math.inf, -math.inf
+        deadline = None
+        if self.time_budget is not None:
+            deadline = perf_counter() + self.time_budget
+        done = 0
+        while self.iterations is None or done < self.iterations:
+            if done and deadline is not None and perf_counter() >= deadline:
+                break
+            sim.restore(root)
+            self._simulate(sim, root_hash, offset)
+            done += 1
+        self.search_iterations = done
+        return int(root_node.actions[np.argmax(root_node.child_visits)])
+
+    def _simulate(self, sim, board_hash, offset):
+        # Selection and expansion down to a new (or terminal) position
+        n = len(sim.agents)
+        path = []  # (node, child index, self scores before the move)
+        while not sim.is_game_over():
+            key = self._key(board_hash, sim)
+            node = self.table.get(key)
+            if node is None:
+                node = _Node(self._legal_actions(sim), n)
+                self.table.put(key, node)
+                new_leaf = True
+            else:
+                new_leaf = False
+            if not len(node.actions):
+                break
+            mover = sim.agents.index(sim.agent_selection)
+            chooser = (mover - offset) % n
+            if node.expanded < len(node.actions):
+                child = node.expanded
+                node.expanded += 1
+            else:
+                child = self._uct_child(node, chooser)
+            action = int(node.actions[child])
+            path.append((node, child, sim.self_scores.copy()))
+            sim.step(action)
+            cells = sim.grid_size**2
+            board_hash ^= int(self._piece_keys[action % cells, action // cells, mover])
+            if new_leaf:
+                break
+
+        # Batched random playouts from the leaf
+        if sim.is_game_over():
+            final_scores, env_score = sim.self_scores.astype(np.float64), sim.env_score
+        else:
+            final_scores, env_score = self._evaluate(sim)
+
+        # Back up each agent's integrated score gained from every node on
+        alpha, beta = sim.rules.alpha, sim.rules.beta
+        for node, child, scores in path:
+            value = alpha * (final_scores - scores) + beta * env_score
+            node.visits += 1
+            node.child_visits[child] += 1
+            node.child_values[child] += value
+            self._low = min(self._low, value.min())
+            self._high = max(self._high, value.max())
+
+    def _uct_child(self, node, chooser):
+        means = node.child_values[:, chooser] / node.child_visits
+        scale = self._high - self._low
+        if scale > 0:
+            means = (means - self._low) / scale
+        bonus = self.exploration * np.sqrt(math.log(node.visits) / node.child_visits)
+        return int(np.argmax(means + bonus))
+
+    def _evaluate(self, sim):
+        if self.eval_cache is None:
+            return self._rollout(sim)
+        # Symmetric positions share one evaluation; scores earned before the
+        # position do not affect play, so the cache holds score gains
+        key, _ = self._canonicalizer.key(sim)
+        evaluation = self.eval_cache.get(key)
+        if evaluation is None:
+            final_scores, env_score = self._rollout(sim)
+            evaluation = (final_scores - sim.self_scores, env_score)
+            self.eval_cache.put(key, evaluation)
+        return sim.self_scores + evaluation[0], evaluation[1]
+
+    def _rollout(self, sim):
+        env = self._rollout_env
+        env.load_game(sim)
+        for _ in range(self._depth):
+            if env.terminated.all():
+                break
+            env.step(env.sample_actions(self.rng))
+        return env.self_scores.mean(axis=0), env.env_scores.mean()
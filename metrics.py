@@ -0,0 +1,158 @@
+# metrics.py
+import os
+import threading
+from bisect import bisect_left
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from time import perf_counter
+
+PHASES = [
+    "decode",
+    "placement",
+    "neighbor_effects",
+    "passive_income",
+    "score",
+    "logging",
+    "select_action",
+]
+COUNTERS = ["steps", "penalty_moves", "invalid_actions"]
+TERMINATION_CAUSES = ["board_filled", "env_score", "max_moves"]
+# Upper bounds (seconds) of the wall-time histogram buckets, +Inf is implicit
+BUCKETS = [
+    1e-6,
+    2.5e-6,
+    5e-6,
+    1e-5,
+    2.5e-5,
+    5e-5,
+    1e-4,
+    2.5e-4,
+    5e-4,
+    1e-3,
+    1e-2,
+    1e-1,
+]
+
+
+class StepMetrics:
+    """
+    Per-phase wall-time histograms and event counters of SimCity games.
+
+    Pass an instance as ``metrics`` to ``SimCityGame``/``SimCityEnv`` to turn
+    instrumentation on; games without one only pay a ``None`` check per phase.
+    The same instance can be shared by many games to aggregate a long run.
+
+    Phases are the ones in ``PHASES``; ``select_action`` and the board logging
+    are timed by ``run_game``. Counters are ``COUNTERS`` plus game ends by
+    cause (``TERMINATION_CAUSES``, ``max_moves`` being a truncation).
+    """
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.buckets = {phase: [0] * (len(BUCKETS) + 1) for phase in PHASES}
+        self.sums = {phase: 0.0 for phase in PHASES}
+        self.counts = {phase: 0 for phase in PHASES}
+        self.counters = {name: 0 for name in COUNTERS}
+        self.terminations = {cause: 0 for cause in TERMINATION_CAUSES}
+
+    def observe(self, phase, seconds):
+        self.buckets[phase][bisect_left(BUCKETS, seconds)] += 1
+        self.sums[phase] += seconds
+        self.counts[phase] += 1
+
+    def lap(self, phase, start):
+        # Record the time since ``start`` under ``phase``, return the new start
+        now = perf_counter()
+        self.observe(phase, now - start)
+        return now
+
+    def count(self, name, n=1):
+        self.counters[name] += n
+
+    def count_termination(self, cause):
+        self.terminations[cause] += 1
+
+    def snapshot(self):
+        """
+        Current metrics as a plain dict.
+
+        Histogram buckets are cumulative counts keyed by their upper bound, as
+        in Prometheus.
+        """
+        histograms = {}
+        for phase in PHASES:
+            cumulative, total = {}, 0
+            for bound, n in zip(BUCKETS + [float("inf")], self.buckets[phase]):
+                total += n
+                cumulative[bound] = total
+            histograms[phase] = {
+                "buckets": cumulative,
+                "sum": self.sums[phase],
+                "count": self.counts[phase],
+            }
+        return {
+            "phase_seconds": histograms,
+            "counters": dict(self.counters),
+            "terminations": dict(self.terminations),
+        }
+
+    def to_prometheus(self):
+        # Prometheus text exposition format of the current metrics
+        snapshot = self.snapshot()
+        lines = [
+            "# HELP simcity_phase_seconds Wall time of each step phase.",
+            "# TYPE simcity_phase_seconds histogram",
+        ]
+        for phase, histogram in snapshot["phase_seconds"].items():
+            for bound, n in histogram["buckets"].items():
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                lines.append(
+                    f'simcity_phase_seconds_bucket{{phase="{phase}",le="{le}"}} {n}'
+                )
+            lines.append(
+                f'simcity_phase_seconds_sum{{phase="{phase}"}} {histogram["sum"]!r}'
+            )
+            lines.append(
+                f'simcity_phase_seconds_count{{phase="{phase}"}} {histogram["count"]}'
+            )
+        for name, value in snapshot["counters"].items():
+            lines.append(f"# TYPE simcity_{name}_total counter")
+            lines.append(f"simcity_{name}_total {value}")
+        lines.append("# HELP simcity_game_ends_total Finished games by cause.")
+        lines.append("# TYPE simcity_game_ends_total counter")
+        for cause, value in snapshot["terminations"].items():
+            lines.append(f'simcity_game_ends_total{{cause="{cause}"}} {value}')
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self, path):
+        # Replace ``path`` atomically, so a node-exporter textfile collector
+        # never reads a partial dump
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w") as f:
+            f.write(self.to_prometheus())
+        os.replace(tmp_path, path)
+
+    def serve(self, port, host="127.0.0.1"):
+        """
+        Serve the Prometheus dump over HTTP from a daemon thread.
+
+        Returns the server; call ``shutdown()`` on it to stop serving.
+        """
+        metrics = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                body = metrics.to_prometheus().encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        server = ThreadingHTTPServer((host, port), Handler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        return server
@@ -0,0 +1,91 @@
+# parallel_env.py
+import numpy as np
+from pettingzoo import ParallelEnv
+from config import RESOURCE_TYPES
+from core import SimCityGame
+from environment import action_space, observation_space
+
+
+class SimCityParallelEnv(ParallelEnv):
+    """
+    PettingZoo ``ParallelEnv`` version of SimCity with simultaneous moves.
+
+    Every agent submits an action each round, agents missing from the
+    actions dict make no move; ``SimCityGame.play_round``
+    resolves same-cell claims with the ``conflict`` rule and applies the whole
+    round in one pass. Observations of one round share a single copy of the
+    grid and builders. ``reset`` starts a fresh game, resources and scores
+    included, and seeds the "random" conflict rule.
+
+    Parameters:
+    - conflict (str): Same-cell conflict rule, one of ``core.CONFLICT_RULES``.
+    - kwargs: Keyword arguments of ``core.SimCityGame`` (``log`` defaults to
+      False here).
+    """
+
+    metadata = {"name": "simcity_parallel_v0", "render_modes": ["human"]}
+
+    def __init__(self, conflict="priority", **kwargs):
+        kwargs.setdefault("log", False)
+        self.game = SimCityGame(**kwargs)
+        self.conflict = conflict
+        self.possible_agents = self.game.agents[:]
+        self.agents = self.possible_agents[:]
+        self._action_space = action_space(self.game)
+        self._observation_space = observation_space(self.game)
+        self.rng = np.random.default_rng()
+
+    def observation_space(self, agent):
+        return self._observation_space
+
+    def action_space(self, agent):
+        return self._action_space
+
+    def reset(self, seed=None, options=None):
+        self.game.restart()
+        self.rng = np.random.default_rng(seed)
+        self.agents = self.possible_agents[:]
+        return self._observations(), {agent: {} for agent in self.agents}
+
+    def step(self, actions):
+        game = self.game
+        # Agents missing from ``actions`` make no move this round
+        round_actions = [actions.get(agent) for agent in self.possible_agents]
+        round_actions = [
+            int(a) if isinstance(a, np.integer) else a for a in round_actions
+        ]
+        rewards = game.play_round(round_actions, self.conflict, self.rng)
+
+        observations = self._observations()
+        rewards = {a: int(r) for a, r in zip(self.possible_agents, rewards.tolist())}
+        terminations = {a: game.terminations[a] for a in self.possible_agents}
+        truncations = {a: game.truncations[a] for a in self.possible_agents}
+        infos = {
+            a: {"integrated_score": float(game.integrated_scores[i])}
+            for i, a in enumerate(self.possible_agents)
+        }
+        if any(terminations.values()) or any(truncations.values()):
+            self.agents = []
+        return observations, rewards, terminations, truncations, infos
+
+    def _observations(self):
+        game = self.game
+        grid, builders = game.grid.copy(), game.builders.copy()
+        return {
+            agent: {
+                "grid": grid,
+                "resources": dict(zip(RESOURCE_TYPES, game.resources[i].tolist())),
+                "builders": builders,
+                "action_mask": game.action_mask(agent),
+            }
+            for i, agent in enumerate(self.possible_agents)
+        }
+
+    def render(self):
+        self.game.render()
+
+    def close(self):
+        self.game.close()
+
+    def state(self):
+        return self.game.state.copy()
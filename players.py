@@ -1,47 +1,106 @@
 # players.py
-import random
-from config import BUILDING_TYPES, BUILDING_COSTS
+from collections.abc import MutableMapping
+import numpy as np
+from config import RESOURCE_TYPES
+from rules import DEFAULT_RULES
+
+RESOURCE_INDEX = {resource: i for i, resource in enumerate(RESOURCE_TYPES)}
+
+
+class Resources(MutableMapping):
+    """
+    Player resources backed by a small integer array, read and written like a dict.
+
+    The array is ordered as ``RESOURCE_TYPES``. ``SimCityEnv`` binds each
+    player's resources to a row of its own ``(n_agents, 2)`` resource array, so
+    the env and the player share the same storage.
+    """
+
+    __slots__ = ("array",)
+
+    def __init__(self, array):
+        self.array = array
+
+    @classmethod
+    def from_values(cls, money=20, reputation=20):
+        return cls(np.array([money, reputation], dtype=np.int32))
+
+    def __getitem__(self, resource):
+        return int(self.array[RESOURCE_INDEX[resource]])
+
+    def __setitem__(self, resource, value):
+        self.array[RESOURCE_INDEX[resource]] = value
+
+    def __delitem__(self, resource):
+        raise TypeError("Resource types are fixed by RESOURCE_TYPES")
+
+    def __iter__(self):
+        return iter(RESOURCE_TYPES)
+
+    def __len__(self):
+        return len(RESOURCE_TYPES)
+
+    def copy(self):
+        return dict(self)
+
+    def __repr__(self):
+        return f"Resources({dict(self)})"
 
 
 class BasePlayer:
-    def __init__(self, name):
+    def __init__(self, name, seed=None):
         self.name = name
         self.self_score = 0
         self.integrated_score = 0
         self.final_score = 0
-        self.resources = {
-            "money": 20,
-            "reputation": 20,
-        }
+        self.resources = Resources.from_values(money=20, reputation=20)
+        self.rng = np.random.default_rng(seed)
+        self.game = None  # Game the player is bound to, set by SimCityGame.players
 
     def select_action(self, observation):
         # To be implemented by subclasses
         pass
 
+    def sample_legal_action(self, observation):
+        # Uniformly sample one legal action, or -1 if there is none
+        legal = np.flatnonzero(legal_action_mask(observation))
+        if legal.size:
+            return int(legal[self.rng.integers(legal.size)])
+        return -1
+
     def update_state(self, reward, info):
         self.self_score += reward
 
         if "resources" in info:
             for resource, change in info["resources"].items():
-                if resource in self.resources:
-                    self.resources[resource] += change
-                else:
-                    self.resources[resource] = change
+                self.resources[resource] += change
+
+
+def legal_action_mask(observation, rules=DEFAULT_RULES):
+    # The env's precomputed mask, or one rebuilt from resources and builders
+    if "action_mask" in observation:
+        return observation["action_mask"]
+    resources = np.array([observation["resources"][r] for r in RESOURCE_TYPES])
+    affordable = np.all(resources >= rules.costs, axis=1)
+    empty = observation["builders"].ravel() < 0
+    return (affordable[:, None] & empty).ravel()
 
 
 class BalancedPlayer(BasePlayer):
     def select_action(self, observation):
-        resources = observation["resources"]
-        available_actions = []
-        for action_id in range(len(BUILDING_TYPES) * observation["grid"].shape[0] ** 2):
-            building_type_idx = action_id // (observation["grid"].shape[0] ** 2)
-            building_type = BUILDING_TYPES[building_type_idx]
-            if (
-                resources["money"] >= BUILDING_COSTS[building_type]["money"]
-                and resources["reputation"]
-                >= BUILDING_COSTS[building_type]["reputation"]
-            ):
-                available_actions.append(action_id)
-        if available_actions:
-            return random.choice(available_actions)
-        return -1
+        return self.sample_legal_action(observation)
+
+
+class GreedyPlayer(BasePlayer):
+    # One-ply player: the legal action with the best immediate integrated
+    # score gain, scored for all actions at once by the bound game
+    def select_action(self, observation):
+        game = self.game
+        evaluation = game.evaluate_actions(game.agent_selection)
+        alpha, beta = game.rules.alpha, game.rules.beta
+        gains = alpha * evaluation["reward"] + beta * evaluation["env_score"]
+        legal = np.flatnonzero(evaluation["legal"])
+        if not legal.size:
+            return -1
+        best = legal[gains[legal] == gains[legal].max()]
+        return int(best[self.rng.integers(best.size)])
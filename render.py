@@ -0,0 +1,146 @@
+# render.py
+import numpy as np
+
+# Fill colors of empty cells and of building types, cycled if there are more
+EMPTY_COLOR = (40, 40, 40)
+BUILDING_COLORS = [(46, 160, 67), (214, 120, 40), (60, 110, 200), (170, 70, 170)]
+# Border colors of builders, cycled if there are more agents
+AGENT_COLORS = [
+    (230, 60, 60),
+    (240, 220, 60),
+    (240, 240, 240),
+    (60, 220, 220),
+    (200, 120, 240),
+    (255, 150, 190),
+]
+# Heat bar colors of the G, V and D channels
+CHANNEL_COLORS = [(40, 200, 80), (90, 150, 255), (255, 90, 60)]
+
+
+class TileAtlas:
+    """
+    Precomputed tiles that ``render_frames`` assembles into RGB frames.
+
+    Each cell is a ``tile`` x ``tile`` square filled with its building type's
+    color, framed in its builder's color, with three G/V/D heat bars along
+    the bottom whose length and brightness grow with the cell's value
+    (clipped to ``0..max_value``).
+
+    Parameters:
+    - num_types (int): Number of building types.
+    - n_agents (int): Number of agents.
+    - tile (int): Tile side in pixels.
+    - levels (int): Distinct heat bar lengths.
+    - max_value (int): G/V/D value drawn as a full bar.
+    """
+
+    def __init__(self, num_types, n_agents, tile=16, levels=16, max_value=100):
+        self.tile = tile
+        self.levels = levels
+        self.max_value = max_value
+        self.bar_height = max(1, tile // 8)
+        border = max(1, tile // 16)
+
+        # (type + 1, builder + 1) -> tile, index 0 meaning empty / no builder
+        fills = [EMPTY_COLOR] + [
+            BUILDING_COLORS[t % len(BUILDING_COLORS)] for t in range(num_types)
+        ]
+        tiles = np.empty((num_types + 1, n_agents + 1, tile, tile, 3), np.uint8)
+        tiles[...] = np.array(fills, dtype=np.uint8)[:, None, None, None, :]
+        for a in range(n_agents):
+            color = np.array(AGENT_COLORS[a % len(AGENT_COLORS)], dtype=np.uint8)
+            frame = tiles[:, a + 1]
+            frame[:, :border] = color
+            frame[:, -border:] = color
+            frame[:, :, :border] = color
+            frame[:, :, -border:] = color
+        tiles[..., -1, :, :] = 0  # Grid line between cells
+        tiles[..., :, -1, :] = 0
+        self.tiles = tiles
+        # Every tile row as one entry, indexed by code * tile + row
+        self.tile_rows = tiles.reshape(-1, tile * 3)
+
+        # (channel, level) -> bar of bar_height x tile pixels
+        bars = np.zeros((3, levels, self.bar_height, tile, 3), np.uint8)
+        for c, color in enumerate(CHANNEL_COLORS):
+            for level in range(levels):
+                width = (level * (tile - 1)) // (levels - 1)
+                shade = 0.35 + 0.65 * level / (levels - 1)
+                bars[c, level, :, :width] = (np.array(color) * shade).astype(np.uint8)
+        self.bars = bars
+
+    def bar_levels(self, grid):
+        clipped = np.clip(grid, 0, self.max_value)
+        return (clipped * (self.levels - 1) + self.max_value // 2) // self.max_value
+
+
+def render_frames(atlas, buildings, builders, grid):
+    """
+    Render a batch of boards into RGB frames in one vectorized pass.
+
+    Parameters:
+    - atlas (TileAtlas): Tiles for the game's building types and agents.
+    - buildings (np.array): ``(N, H, W)`` building type indices, -1 when empty.
+    - builders (np.array): ``(N, H, W)`` builder indices, -1 when empty.
+    - grid (np.array): ``(N, H, W, 3)`` G/V/D values.
+
+    Returns a ``(N, H * tile, W * tile, 3)`` uint8 array.
+    """
+    buildings = np.asarray(buildings)
+    n, h, w = buildings.shape
+    tile, bar = atlas.tile, atlas.bar_height
+    # Gather tile rows straight into frame layout (N, H, tile rows, W, tile * 3)
+    codes = (buildings.astype(np.intp) + 1) * atlas.tiles.shape[1] + (
+        np.asarray(builders, dtype=np.intp) + 1
+    )
+    rows = codes[:, :, None, :] * tile + np.arange(tile)[:, None]
+    frames = atlas.tile_rows[rows].reshape(n, h, tile, w, tile, 3)
+    # Stack the G/V/D bars above the bottom grid line of every tile
+    levels = atlas.bar_levels(np.asarray(grid))
+    for c in range(3):
+        top = tile - 1 - (3 - c) * bar
+        if top < 0:
+            continue
+        bars = atlas.bars[c, levels[..., c]]  # (N, H, W, bar, tile, 3)
+        frames[:, :, top : top + bar] = bars.transpose(0, 1, 3, 2, 4, 5)
+    return frames.reshape(n, h * tile, w * tile, 3)
+
+
+def write_video(frames, path, fps=4):
+    """
+    Write ``(T, H, W, 3)`` frames to ``path``.
+
+    ``.npy`` files are written with NumPy; any other format (mp4, gif, ...)
+    needs the optional ``imageio`` package (``imageio[ffmpeg]`` for mp4).
+    """
+    frames = np.asarray(frames)
+    if path.endswith(".npy"):
+        np.save(path, frames)
+        return
+    try:
+        import imageio.v2 as imageio
+    except ImportError as e:
+        raise ImportError(
+            "Writing videos needs imageio: pip install imageio[ffmpeg]"
+        ) from e
+    if path.endswith(".gif"):
+        imageio.mimsave(path, list(frames), duration=1 / fps)
+    else:
+        imageio.mimsave(path, list(frames), fps=fps)
+
+
+def render_trajectory_video(path, out_path, tile=16, fps=4):
+    """
+    Render every turn of a trajectory file (see ``log.TrajectoryRecorder``) in
+    one batch and write it as a video.
+    """
+    from log import read_trajectory
+
+    header, records = read_trajectory(path)
+    states = records["state"]
+    atlas = TileAtlas(len(header["building_types"]), len(header["agents"]), tile)
+    frames = render_frames(
+        atlas, states["buildings"], states["builders"], states["grid"]
+    )
+    write_video(frames, out_path, fps=fps)
+    return frames
@@ -0,0 +1,141 @@
+# rules.py
+import json
+import os
+import numpy as np
+from config import (
+    BUILDING_TYPES,
+    RESOURCE_TYPES,
+    BUILDING_COSTS,
+    BUILDING_UTILITIES,
+    BUILDING_EFFECTS,
+    SCORE_WEIGHTS,
+)
+
+CHANNELS = ["G", "V", "D"]
+NEIGHBOR_OFFSETS = [(-1, 0), (1, 0), (0, -1), (0, 1)]
+
+
+class Rules:
+    """
+    Dense rule tables compiled from a building catalogue.
+
+    Attributes:
+    - building_types (list): Building names, position is the type index.
+    - type_index (dict): Building name to type index.
+    - costs (np.array): ``(T, 2)`` build costs in ``RESOURCE_TYPES`` order.
+    - utilities (np.array): ``(T, 2)`` utilities in ``RESOURCE_TYPES`` order.
+    - utility_rewards (np.array): ``(T,)`` reward of one building's utility.
+    - radius (int): Largest influence distance of any building.
+    - kernels (np.array): ``(T, 2r+1, 2r+1, 3)`` G/V/D stencil centred on the
+      placed building, the centre holds its own effect.
+    - offsets (np.array): ``(K, 2)`` stencil offsets with a non-zero effect for
+      at least one type.
+    - offset_effects (np.array): ``(T, K, 3)`` effect of each type at each offset.
+    - alpha (float): Weight of the self score in the integrated score.
+    - beta (float): Weight of the environment score in the integrated score.
+    """
+
+    def __init__(self, building_types, costs, utilities, kernels, score_weights=None):
+        self.building_types = list(building_types)
+        self.type_index = {name: i for i, name in enumerate(self.building_types)}
+        self.num_types = len(self.building_types)
+        self.costs = np.asarray(costs, dtype=np.int32)
+        self.utilities = np.asarray(utilities, dtype=np.int32)
+        self.utility_rewards = self.utilities.sum(axis=1)
+        self.kernels = np.asarray(kernels, dtype=np.int32)
+        self.radius = self.kernels.shape[1] // 2
+
+        # Sparse view of the kernels for engines that apply one offset at a time
+        used = np.argwhere(np.any(self.kernels != 0, axis=(0, 3)))
+        used = used[np.argsort(np.abs(used - self.radius).sum(axis=1), kind="stable")]
+        self.offsets = used - self.radius
+        self.offset_effects = self.kernels[:, used[:, 0], used[:, 1]]
+
+        score_weights = {**SCORE_WEIGHTS, **(score_weights or {})}
+        self.alpha = float(score_weights["alpha"])
+        self.beta = float(score_weights["beta"])
+
+
+def catalogue_from_config():
+    # Building catalogue equivalent to the tables in config.py
+    return {
+        name: {
+            "cost": BUILDING_COSTS[name],
+            "utility": BUILDING_UTILITIES[name],
+            "effects": BUILDING_EFFECTS[name],
+        }
+        for name in BUILDING_TYPES
+    }
+
+
+def compile_rules(catalogue, score_weights=None):
+    """
+    Compile a building catalogue into a ``Rules`` object.
+
+    The catalogue maps building names to ``cost`` and ``utility`` resource
+    dicts and an ``effects`` dict laid out like ``config.BUILDING_EFFECTS``:
+    G/V/D on the building's own cell, ``neighbors`` for the four adjacent
+    cells, and an optional ``stencil`` list of ``{"offset": [dx, dy], "G": ...}``
+    entries for any further cell. Missing values default to 0.
+    ``score_weights`` overrides the ``alpha``/``beta`` of ``config.SCORE_WEIGHTS``.
+    """
+    names = list(catalogue)
+    stencils = []
+    for name in names:
+        effects = catalogue[name].get("effects", {})
+        stencil = {(0, 0): [effects.get(c, 0) for c in CHANNELS]}
+        neighbors = effects.get("neighbors", {})
+        for offset in NEIGHBOR_OFFSETS:
+            stencil[offset] = [neighbors.get(c, 0) for c in CHANNELS]
+        for entry in effects.get("stencil", []):
+            offset = tuple(entry["offset"])
+            current = stencil.get(offset, [0, 0, 0])
+            stencil[offset] = [v + entry.get(c, 0) for v, c in zip(current, CHANNELS)]
+        stencils.append(stencil)
+
+    radius = max(max(abs(dx), abs(dy)) for s in stencils for dx, dy in s)
+    kernels = np.zeros((len(names), 2 * radius + 1, 2 * radius + 1, 3), np.int32)
+    for t, stencil in enumerate(stencils):
+        for (dx, dy), effect in stencil.items():
+            kernels[t, radius + dx, radius + dy] = effect
+
+    costs = [[catalogue[n]["cost"].get(r, 0) for r in RESOURCE_TYPES] for n in names]
+    utilities = [
+        [catalogue[n]["utility"].get(r, 0) for r in RESOURCE_TYPES] for n in names
+    ]
+    return Rules(names, costs, utilities, kernels, score_weights)
+
+
+def load_rules(path):
+    """
+    Compile an external JSON or TOML building catalogue.
+
+    The file holds one table per building under ``buildings``, e.g. in TOML::
+
+        [buildings.Park]
+        cost = {money = 1, reputation = 3}
+        utility = {money = -1, reputation = 3}
+        effects = {G = 30, V = -30, neighbors = {G = 10, V = -10}}
+
+    An optional top-level ``score_weights`` table sets ``alpha`` and ``beta``.
+    """
+    if os.path.splitext(path)[1] == ".toml":
+        # tomllib is only in the standard library from Python 3.11
+        try:
+            import tomllib
+        except ImportError:
+            try:
+                import tomli as tomllib
+            except ImportError as e:
+                raise ImportError(
+                    "Reading TOML rules needs Python 3.11+ or tomli: pip install tomli"
+                ) from e
+        with open(path, "rb") as f:
+            data = tomllib.load(f)
+    else:
+        with open(path) as f:
+            data = json.load(f)
+    return compile_rules(data["buildings"], data.get("score_weights"))
+
+
+DEFAULT_RULES = compile_rules(catalogue_from_config())
@@ -0,0 +1,585 @@
+# solver.py
+import argparse
+import json
+import multiprocessing
+import os
+import shutil
+import tempfile
+import numpy as np
+from config import RESOURCE_TYPES
+from core import SimCityGame
+from players import BasePlayer
+from rules import DEFAULT_RULES
+from symmetry import Canonicalizer
+from vector_env import VectorSimCityEnv
+
+OBJECTIVES = ("self", "integrated", "env")
+# Per-position arrays of a layer, as returned for children by _expand
+CHILD_FIELDS = (
+    "buildings",
+    "grid",
+    "resources",
+    "agent_index",
+    "terminated",
+    "env_score",
+)
+
+_FNV_OFFSET = np.uint64(0xCBF29CE484222325)
+_FNV_PRIME = np.uint64(0x100000001B3)
+
+
+def objective_weights(objective, rules):
+    # (weight of the rewards still to come, weight of the final env score)
+    if objective == "self":
+        return 1.0, 0.0
+    if objective == "integrated":
+        return rules.alpha, rules.beta
+    if objective == "env":
+        return 0.0, 1.0
+    raise ValueError(f"objective must be one of {OBJECTIVES}")
+
+
+def hash_keys(keys):
+    # 64-bit FNV-1a hash of every row of a (N, key_size) uint8 array
+    h = np.full(len(keys), _FNV_OFFSET, dtype=np.uint64)
+    with np.errstate(over="ignore"):
+        for column in keys.T:
+            h = (h ^ column) * _FNV_PRIME
+    return h
+
+
+def key_size(grid_size, n_agents):
+    # Canonical buildings, resources, agent to move and move count
+    return grid_size**2 + 4 * n_agents * len(RESOURCE_TYPES) + 3
+
+
+def make_keys(buildings, resources, agent_index, num_moves):
+    """
+    Position keys of a batch of canonical positions, one uint8 row each.
+
+    The value of a position only depends on what can still happen: the
+    buildings (the G/V/D grid follows from them), every agent's resources,
+    the agent to move and the move count (for the move limit). Builders and
+    past scores are left out, as passive income goes to whoever moves, so
+    positions reached by different players or move orders share one key.
+    """
+    n = len(buildings)
+    return np.concatenate(
+        [
+            buildings.reshape(n, -1).view(np.uint8),
+            np.ascontiguousarray(resources).reshape(n, -1).view(np.uint8),
+            np.asarray(agent_index, dtype=np.uint8).reshape(n, 1),
+            np.broadcast_to(
+                np.array([num_moves], dtype=np.uint16).view(np.uint8), (n, 2)
+            ),
+        ],
+        axis=1,
+    )
+
+
+def canonical_symmetries(canonicalizer, buildings):
+    """
+    Index (into ``canonicalizer.symmetries``) of the symmetry mapping each of
+    a batch of boards onto its canonical board: the one whose cells, read as
+    bytes, are smallest (empty cells, -1, compare as 255), the first on ties.
+    """
+    n = len(buildings)
+    flat = buildings.reshape(n, -1)
+    num_types = canonicalizer.rules.num_types
+    digits = np.where(flat < 0, num_types, flat).astype(np.int64)
+    cells = flat.shape[1]
+    powers = (num_types + 1) ** np.arange(cells - 1, -1, -1, dtype=np.int64)
+    # (n, symmetries) base num_types + 1 numbers in the order of the bytes
+    codes = digits[:, canonicalizer.permutations] @ powers
+    return np.argmin(codes, axis=1)
+
+
+def _position_key(game, canonicalizer):
+    # Key of the current position of a SimCityGame, and its symmetry
+    buildings = game.buildings[None]
+    symmetry = int(canonical_symmetries(canonicalizer, buildings)[0])
+    board = buildings.reshape(1, -1)[:, canonicalizer.permutations[symmetry]]
+    key = make_keys(
+        board,
+        game.resources[None],
+        [game.agents.index(game.agent_selection)],
+        game.num_moves,
+    )
+    return key[0].tobytes(), symmetry
+
+
+def _expand(args):
+    """
+    Play every distinct legal move of a batch of canonical positions in one
+    ``VectorSimCityEnv.step``.
+
+    Moves that are a symmetry of another move of the same position (the same
+    building on two cells swapped by a symmetry that leaves the board
+    unchanged) lead to equivalent positions with equal rewards and are pruned.
+    A position without a legal move passes (action -1, a penalty move).
+
+    Returns the edges (parent, action, reward) and the canonical children.
+    """
+    grid, buildings, resources, agent_index, num_moves, settings = args
+    rules = settings["rules"]
+    canonicalizer = Canonicalizer(settings["grid_size"], rules)
+    permutations = canonicalizer.permutations
+    n, cells = len(buildings), settings["grid_size"] ** 2
+
+    flat = buildings.reshape(n, cells)
+    movers = resources[np.arange(n), agent_index]
+    affordable = np.all(movers[:, None, :] >= rules.costs, axis=2)
+    empty = flat < 0
+    # Cells that are the smallest of their orbit under the board's stabilizer
+    stabilizer = np.all(flat[:, permutations] == flat[:, None, :], axis=2)
+    representative = np.where(stabilizer[:, :, None], permutations, cells).min(axis=1)
+    distinct = representative == np.arange(cells)
+    legal = affordable[:, :, None] & (empty & distinct)[:, None, :]
+    parents, types, moves = np.nonzero(legal)
+    actions = types * cells + moves
+    passing = np.flatnonzero(~legal.any(axis=(1, 2)))
+    parents = np.concatenate([parents, passing])
+    actions = np.concatenate([actions, np.full(passing.size, -1)])
+
+    env = VectorSimCityEnv(
+        len(parents),
+        grid_size=settings["grid_size"],
+        n_agents=settings["num_players"],
+        rules=rules,
+    )
+    size = settings["grid_size"]
+    env.load_states(
+        grid[parents].reshape(-1, size, size, 3),
+        buildings[parents].reshape(-1, size, size),
+        resources[parents],
+        agent_index[parents],
+        num_moves,
+    )
+    rewards, terminated, _ = env.step(actions)
+    if num_moves + 1 >= settings["max_moves"]:
+        terminated[...] = True
+
+    # Map every child onto its canonical board
+    symmetries = canonical_symmetries(canonicalizer, env.buildings)
+    order = permutations[symmetries]
+    rows = np.arange(len(parents))[:, None]
+    child_buildings = env.buildings.reshape(-1, cells)[rows, order]
+    child_grid = env.grid.reshape(-1, cells, 3)[rows, order]
+    return {
+        "parent": parents,
+        "action": actions,
+        "reward": rewards,
+        "buildings": child_buildings,
+        "grid": child_grid,
+        "resources": env.resources,
+        "agent_index": env.agent_index,
+        "terminated": terminated,
+        "env_score": env.env_scores,
+    }
+
+
+def _child_keys(children, num_moves):
+    return make_keys(
+        children["buildings"],
+        children["resources"],
+        children["agent_index"],
+        num_moves,
+    )
+
+
+def _unique_rows(keys):
+    # Rows of the first occurrence of every distinct key, and the distinct
+    # key of every row
+    _, unique, inverse = np.unique(
+        keys.view(np.dtype((np.void, keys.shape[1]))).ravel(),
+        return_index=True,
+        return_inverse=True,
+    )
+    return unique, inverse.ravel()
+
+
+def _save_layer(directory, index, **arrays):
+    for name, array in arrays.items():
+        np.save(os.path.join(directory, f"layer{index}-{name}.npy"), array)
+
+
+def _load_layer(directory, index, name):
+    return np.load(os.path.join(directory, f"layer{index}-{name}.npy"), mmap_mode="r")
+
+
+def solve(
+    path,
+    grid_size=3,
+    num_players=3,
+    starting_resources=None,
+    rules=None,
+    objective="integrated",
+    max_moves=None,
+    workers=None,
+    chunk_size=20000,
+):
+    """
+    Solve every position reachable from the start of a game by retrograde
+    analysis and write the solution table to ``path``.
+
+    Every agent moves to maximize its own ``objective``: "self" (its future
+    rewards), "integrated" (``alpha`` times its future rewards plus ``beta``
+    times the final env score) or "env" (the final env score, shared by every
+    agent). The game is deterministic, so the expectimax value of a position
+    is the max^n value of its moves; ties go to the lowest action.
+
+    Every move advances the move count, so positions form layers by move
+    count. The forward pass expands each layer in chunks of ``chunk_size``
+    positions over ``workers`` processes, merges transpositions and symmetric
+    positions into one canonical position each, and writes the layer to a
+    scratch directory inside ``path``, so only one layer is held in memory.
+    The backward pass then computes every layer's values from the next one's
+    and writes them straight into the memory-mapped table, so memory use is
+    bounded by the two largest layers rather than the whole table.
+
+    Parameters:
+    - path (str): Output directory of the ``SolutionTable``.
+    - grid_size (int): Side length of the (square) board.
+    - num_players (int): Number of agents.
+    - starting_resources (dict): Resources every agent starts with (20 each
+      by default).
+    - rules (Rules): Compiled rule tables, defaults to the tables in config.py.
+    - objective (str): One of ``OBJECTIVES``.
+    - max_moves (int): Move limit, four moves per cell by default; games where
+      nobody can afford a building would otherwise never end.
+    - workers (int): Worker processes, defaults to the number of CPUs.
+    - chunk_size (int): Positions expanded per task.
+    """
+    rules = rules if rules is not None else DEFAULT_RULES
+    starting_resources = starting_resources or {r: 20 for r in RESOURCE_TYPES}
+    max_moves = max_moves or 4 * grid_size**2
+    reward_weight, env_weight = objective_weights(objective, rules)
+    settings = {
+        "grid_size": grid_size,
+        "num_players": num_players,
+        "rules": rules,
+        "max_moves": max_moves,
+    }
+    start = SimCityGame(
+        grid_size=grid_size,
+        num_players=num_players,
+        starting_resources=starting_resources,
+        rules=rules,
+        log=False,
+    )
+    workers = workers or os.cpu_count()
+    pool = multiprocessing.Pool(workers) if workers > 1 else None
+    os.makedirs(path, exist_ok=True)
+    scratch = tempfile.mkdtemp(prefix="scratch-", dir=path)
+    try:
+        # Forward pass: the reachable canonical positions of every layer
+        layer = {
+            "buildings": start.buildings.reshape(1, -1).copy(),
+            "grid": start.grid.reshape(1, -1, 3).copy(),
+            "resources": start.resources[None].copy(),
+            "agent_index": np.array([start.agents.index(start.agent_selection)]),
+            "terminated": np.array([start.is_game_over()]),
+            "env_score": np.array([start.env_score]),
+        }
+        num_layers = 0
+        while True:
+            keys = make_keys(
+                layer["buildings"],
+                layer["resources"],
+                layer["agent_index"],
+                num_layers,
+            )
+            _save_layer(
+                scratch,
+                num_layers,
+                keys=keys,
+                agent_index=layer["agent_index"].astype(np.int8),
+                terminated=layer["terminated"],
+                env_score=layer["env_score"],
+            )
+            live = np.flatnonzero(~layer["terminated"])
+            num_layers += 1
+            if not live.size:
+                break
+            chunks = np.array_split(live, -(-live.size // chunk_size))
+            jobs = [
+                (
+                    layer["grid"][chunk],
+                    layer["buildings"][chunk],
+                    layer["resources"][chunk],
+                    layer["agent_index"][chunk],
+                    num_layers - 1,
+                    settings,
+                )
+                for chunk in chunks
+            ]
+            # Merge each chunk's duplicate children as it arrives, so only
+            # the edges and distinct children of the layer are kept
+            edges, parts = [], []
+            finished = pool.imap(_expand, jobs) if pool else map(_expand, jobs)
+            for chunk, result in zip(chunks, finished):
+                unique, inverse = _unique_rows(_child_keys(result, num_layers))
+                edges.append(
+                    (
+                        chunk[result["parent"]],
+                        result["action"].astype(np.int32),
+                        result["reward"],
+                        inverse,
+                    )
+                )
+                parts.append({name: result[name][unique] for name in CHILD_FIELDS})
+            children = {
+                name: np.concatenate([part[name] for part in parts])
+                for name in CHILD_FIELDS
+            }
+            starts = np.cumsum([0] + [len(part["terminated"]) for part in parts])
+            del parts
+            unique, inverse = _unique_rows(_child_keys(children, num_layers))
+            _save_layer(
+                scratch,
+                num_layers - 1,
+                parent=np.concatenate([e[0] for e in edges]),
+                action=np.concatenate([e[1] for e in edges]),
+                reward=np.concatenate([e[2] for e in edges]),
+                child=np.concatenate(
+                    [inverse[start + e[3]] for start, e in zip(starts, edges)]
+                ).astype(np.int64),
+            )
+            layer = {name: children[name][unique] for name in CHILD_FIELDS}
+
+        # Lay the table out in layer order and index every layer's keys
+        sizes = [len(_load_layer(scratch, i, "terminated")) for i in range(num_layers)]
+        offsets = np.concatenate([[0], np.cumsum(sizes)])
+        meta = {
+            "grid_size": grid_size,
+            "num_players": num_players,
+            "starting_resources": starting_resources,
+            "objective": objective,
+            "max_moves": max_moves,
+            "building_types": rules.building_types,
+            "score_weights": [rules.alpha, rules.beta],
+            "key_size": key_size(grid_size, num_players),
+            "layers": num_layers,
+            "positions": int(offsets[-1]),
+        }
+        table = SolutionTable(path, meta)
+        for index in range(num_layers):
+            keys = np.asarray(_load_layer(scratch, index, "keys"))
+            table.insert(keys, offsets[index])
+
+        # Backward pass: every agent's value of every position, last layer
+        # first, written straight into the table
+        next_values = None
+        for index in reversed(range(num_layers)):
+            terminated = np.asarray(_load_layer(scratch, index, "terminated"))
+            env_score = np.asarray(_load_layer(scratch, index, "env_score"))
+            agent_index = np.asarray(_load_layer(scratch, index, "agent_index"))
+            values = np.repeat(env_weight * env_score[:, None], num_players, axis=1)
+            best = np.full(len(terminated), -1, dtype=np.int32)
+            if next_values is not None:
+                parent = np.asarray(_load_layer(scratch, index, "parent"))
+                action = np.asarray(_load_layer(scratch, index, "action"))
+                reward = np.asarray(_load_layer(scratch, index, "reward"))
+                child = np.asarray(_load_layer(scratch, index, "child"))
+                edge_values = next_values[child]
+                mover = agent_index[parent].astype(np.intp)
+                edges = np.arange(len(parent))
+                edge_values[edges, mover] += reward_weight * reward
+                # Per parent, the move best for the mover, lowest action on ties
+                order = np.lexsort((action, -edge_values[edges, mover], parent))
+                parents, first = np.unique(parent[order], return_index=True)
+                values[parents] = edge_values[order[first]]
+                best[parents] = action[order[first]]
+            rows = slice(offsets[index], offsets[index + 1])
+            table.values[rows] = values
+            table.actions[rows] = best
+            next_values = values
+        table.close()
+    finally:
+        if pool is not None:
+            pool.terminate()
+        shutil.rmtree(scratch, ignore_errors=True)
+    return SolutionTable(path)
+
+
+class SolutionTable:
+    """
+    Solved positions in memory-mapped arrays with an open-addressing hash
+    index: every lookup hashes the position key once and probes a few
+    neighboring slots of the index.
+
+    A table directory holds ``keys.npy`` (position keys in layer order),
+    ``values.npy`` (float32 value of every agent), ``actions.npy`` (optimal
+    action on the canonical board), ``index.npy`` (hash slots holding row
+    numbers, -1 when empty) and ``meta.json`` with the settings it was
+    solved for.
+
+    Parameters:
+    - path (str): Table directory.
+    - meta (dict): Settings of a new table, whose arrays are then created
+      empty and writable; ``meta.json`` is only written by ``close``, once
+      the table is complete.
+    """
+
+    def __init__(self, path, meta=None):
+        self.path = path
+        writable = meta is not None
+        if not writable:
+            with open(os.path.join(path, "meta.json")) as f:
+                meta = json.load(f)
+        self.meta = meta
+        n = meta["positions"]
+        # At most half the index slots are used, so probe runs stay short
+        capacity = 1 << max(4, int(2 * n - 1).bit_length())
+        layout = {
+            "index": ((capacity,), np.int32),
+            "keys": ((n, meta["key_size"]), np.uint8),
+            "values": ((n, meta["num_players"]), np.float32),
+            "actions": ((n,), np.int32),
+        }
+        if writable:
+            os.makedirs(path, exist_ok=True)
+            # A table being rewritten is incomplete until close
+            if os.path.exists(os.path.join(path, "meta.json")):
+                os.remove(os.path.join(path, "meta.json"))
+        for name, (shape, dtype) in layout.items():
+            file = os.path.join(path, f"{name}.npy")
+            if writable:
+                array = np.lib.format.open_memmap(
+                    file, mode="w+", dtype=dtype, shape=shape
+                )
+            else:
+                array = np.load(file, mmap_mode="r")
+            setattr(self, name, array)
+        if writable:
+            self.index[...] = -1
+        self.mask = capacity - 1
+        self._canonicalizers = {}
+
+    def __len__(self):
+        return int(self.meta["positions"])
+
+    def insert(self, keys, offset):
+        """
+        Store ``(N, key_size)`` keys as rows ``offset`` to ``offset + N`` and
+        add them to the index.
+        """
+        self.keys[offset : offset + len(keys)] = keys
+        mask = np.uint64(self.mask)
+        key_hashes = hash_keys(keys)
+        # Linear probing, resolved for all pending keys at once: each round
+        # the first key aiming at a free slot takes it, the rest move on
+        pending = np.arange(len(keys))
+        probe = np.zeros(len(keys), dtype=np.uint64)
+        while pending.size:
+            slots = ((key_hashes[pending] + probe[pending]) & mask).astype(np.int64)
+            _, winners = np.unique(slots, return_index=True)
+            won = np.zeros(pending.size, dtype=bool)
+            won[winners] = True
+            won &= self.index[slots] < 0
+            self.index[slots[won]] = offset + pending[won]
+            probe[pending[~won]] += np.uint64(1)
+            pending = pending[~won]
+
+    def close(self):
+        # Flush a new table to disk and mark it complete
+        for name in ("index", "keys", "values", "actions"):
+            getattr(self, name).flush()
+        with open(os.path.join(self.path, "meta.json"), "w") as f:
+            json.dump(self.meta, f, indent=2)
+
+    def _row(self, key):
+        h = hash_keys(np.frombuffer(key, np.uint8)[None])[0]
+        slot = int(h) & self.mask
+        while True:
+            row = int(self.index[slot])
+            if row < 0:
+                return None
+            if self.keys[row].tobytes() == key:
+                return row
+            slot = (slot + 1) & self.mask
+
+    def lookup(self, game):
+        """
+        Values of every agent and the optimal action of the agent to move in
+        the current position of ``game``, or None if it was not solved.
+        """
+        meta = self.meta
+        if (
+            game.grid_size != meta["grid_size"]
+            or len(game.agents) != meta["num_players"]
+        ):
+            raise ValueError("The game does not match the solved board")
+        canonicalizer = self._canonicalizers.get(id(game.rules))
+        if canonicalizer is None:
+            canonicalizer = Canonicalizer(game.grid_size, game.rules)
+            self._canonicalizers[id(game.rules)] = canonicalizer
+        key, symmetry = _position_key(game, canonicalizer)
+        row = self._row(key)
+        if row is None:
+            return None
+        action = int(self.actions[row])
+        if action >= 0:
+            action = canonicalizer.untransform_action(action, symmetry)
+        return self.values[row].astype(np.float64), action
+
+
+class OraclePlayer(BasePlayer):
+    """
+    Player that looks up the optimal move of the bound game in a
+    ``SolutionTable``.
+
+    The table holds the max^n move of the agent to move, which is the move
+    played whichever player ``run_game`` asks for it. Positions missing from
+    the table (another move limit or starting resources) are counted in
+    ``misses`` and answered with a random legal action.
+    """
+
+    def __init__(self, name, table, seed=None):
+        super().__init__(name, seed=seed)
+        self.table = table
+        self.misses = 0
+
+    def select_action(self, observation):
+        if self.game is None:
+            raise RuntimeError("OraclePlayer must be bound to a game via env.players")
+        entry = self.table.lookup(self.game)
+        if entry is None:
+            self.misses += 1
+            return self.sample_legal_action(observation)
+        return entry[1]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Solve a small SimCity board.")
+    parser.add_argument("path", help="Output directory of the solution table.")
+    parser.add_argument("--grid-size", type=int, default=3)
+    parser.add_argument("--players", type=int, default=3)
+    parser.add_argument("--objective", choices=OBJECTIVES, default="integrated")
+    parser.add_argument("--max-moves", type=int, default=None)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--chunk-size", type=int, default=20000)
+    args = parser.parse_args()
+
+    table = solve(
+        args.path,
+        grid_size=args.grid_size,
+        num_players=args.players,
+        objective=args.objective,
+        max_moves=args.max_moves,
+        workers=args.workers,
+        chunk_size=args.chunk_size,
+    )
+    game = SimCityGame(
+        grid_size=args.grid_size,
+        num_players=args.players,
+        starting_resources=table.meta["starting_resources"],
+        log=False,
+    )
+    values, action = table.lookup(game)
+    print(f"{len(table)} positions solved, start values {values.tolist()}")
+    print(f"optimal first move: {game.decode_action(action)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,350 @@
+# sweep.py
+import argparse
+import ast
+import copy
+import hashlib
+import itertools
+import json
+import multiprocessing
+import os
+import numpy as np
+from config import RESOURCE_TYPES
+from rules import CHANNELS, catalogue_from_config, compile_rules
+from tournament import play_game
+
+# Modules whose code decides cached summaries: the games (tournament.py) and
+# how they are configured and summarized (this module). Editing them or any
+# local module they import, directly or not, invalidates the cache
+GAME_MODULE = "tournament.py"
+SWEEP_MODULE = os.path.basename(__file__)
+# Games ending below this env score collapsed (see SimCityGame.is_game_over)
+COLLAPSE_SCORE = 10
+DEFAULT_CACHE_DIR = ".sweep_cache"
+
+
+def code_modules(root=None):
+    """
+    Files of GAME_MODULE, SWEEP_MODULE and every module of the repository
+    they import, following imports inside functions too, in sorted order.
+    """
+    root = root or os.path.dirname(os.path.abspath(__file__))
+    found, pending = set(), [GAME_MODULE, SWEEP_MODULE]
+    while pending:
+        name = pending.pop()
+        if name in found:
+            continue
+        found.add(name)
+        with open(os.path.join(root, name)) as f:
+            tree = ast.parse(f.read())
+        for node in ast.walk(tree):
+            if isinstance(node, ast.Import):
+                modules = [alias.name for alias in node.names]
+            elif isinstance(node, ast.ImportFrom) and node.module:
+                modules = [node.module]
+            else:
+                continue
+            for module in modules:
+                path = module.split(".")[0] + ".py"
+                if os.path.exists(os.path.join(root, path)):
+                    pending.append(path)
+    return sorted(found)
+
+
+def code_version(root=None):
+    # Hash of the source of code_modules()
+    digest = hashlib.sha256()
+    root = root or os.path.dirname(os.path.abspath(__file__))
+    for name in code_modules(root):
+        digest.update(name.encode())
+        with open(os.path.join(root, name), "rb") as f:
+            digest.update(f.read())
+    return digest.hexdigest()[:16]
+
+
+# Catalogue paths below a building name that a sweep parameter may set
+PARAMETER_PATHS = (
+    {("cost", r) for r in RESOURCE_TYPES}
+    | {("utility", r) for r in RESOURCE_TYPES}
+    | {("effects", c) for c in CHANNELS}
+    | {("effects", "neighbors", c) for c in CHANNELS}
+)
+
+
+def parameter_path(name, catalogue):
+    """
+    Split a sweep parameter name into its catalogue path, e.g.
+    ``"House.effects.neighbors.D"`` -> ``["House", "effects", "neighbors", "D"]``.
+
+    Raises ValueError for unknown buildings, resources or channels, so a typo
+    cannot silently sweep the default rules.
+    """
+    building, *path = name.split(".")
+    if building not in catalogue:
+        raise ValueError(
+            f"Unknown building {building!r} in sweep parameter {name!r}, "
+            f"expected one of {list(catalogue)}"
+        )
+    if tuple(path) not in PARAMETER_PATHS:
+        raise ValueError(
+            f"Unknown sweep parameter {name!r}, expected alpha, beta or "
+            f"Building.cost.<resource>, Building.utility.<resource>, "
+            f"Building.effects.<channel> or Building.effects.neighbors.<channel> "
+            f"with resources {RESOURCE_TYPES} and channels {CHANNELS}"
+        )
+    return [building] + path
+
+
+def make_rules(config):
+    """
+    Compile the rules of one sweep configuration.
+
+    ``config`` maps parameter names to values. ``alpha`` and ``beta`` are the
+    integrated score weights; every other name is a dotted path into the
+    building catalogue of config.py, e.g. ``Park.cost.money``,
+    ``Shop.effects.G`` or ``House.effects.neighbors.D`` (see
+    ``parameter_path``). Catalogue values are rounded to integers.
+    """
+    catalogue = copy.deepcopy(catalogue_from_config())
+    score_weights = {}
+    for name, value in config.items():
+        if name in ("alpha", "beta"):
+            score_weights[name] = float(value)
+            continue
+        *path, key = parameter_path(name, catalogue)
+        table = catalogue
+        for part in path:
+            table = table.setdefault(part, {})
+        table[key] = int(round(value))
+    return compile_rules(catalogue, score_weights)
+
+
+def grid_design(space):
+    # Every combination of the listed values, space maps names to value lists
+    names = list(space)
+    return [dict(zip(names, values)) for values in itertools.product(*space.values())]
+
+
+def _scale(space, unit):
+    # Map points of the unit cube onto (low, high) ranges, integer ranges
+    # (both bounds int) are sampled on their integers
+    configs = []
+    for point in unit:
+        config = {}
+        for (name, (low, high)), u in zip(space.items(), point):
+            if isinstance(low, int) and isinstance(high, int):
+                config[name] = min(high, low + int(u * (high - low + 1)))
+            else:
+                config[name] = float(low + u * (high - low))
+        configs.append(config)
+    return configs
+
+
+def random_design(space, n, seed=0):
+    # ``n`` configurations drawn uniformly, space maps names to (low, high)
+    rng = np.random.default_rng(seed)
+    return _scale(space, rng.random((n, len(space))))
+
+
+def latin_hypercube_design(space, n, seed=0):
+    """
+    ``n`` configurations from a Latin hypercube over the ``(low, high)`` ranges
+    of ``space``: every parameter's range is cut into ``n`` equal strata and
+    each stratum is sampled exactly once.
+    """
+    rng = np.random.default_rng(seed)
+    strata = np.argsort(rng.random((len(space), n)), axis=1).T
+    return _scale(space, (strata + rng.random((n, len(space)))) / n)
+
+
+DESIGNS = {
+    "grid": grid_design,
+    "random": random_design,
+    "lhs": latin_hypercube_design,
+}
+
+
+def config_key(config, settings):
+    # Cache key of one configuration played with the given sweep settings
+    text = json.dumps({"config": config, **settings}, sort_keys=True)
+    return hashlib.sha256(text.encode()).hexdigest()
+
+
+def gini(values):
+    # Gini coefficient of non-negative values, 0 when all are equal or zero
+    values = np.sort(np.asarray(values, dtype=np.float64))
+    total = values.sum()
+    if total <= 0:
+        return 0.0
+    n = len(values)
+    return float((2 * np.arange(1, n + 1) - n - 1) @ values / (n * total))
+
+
+def evaluate_config(config, games, seed=0, max_moves=1000):
+    """
+    Play ``games`` seeded games of one configuration and summarize them.
+
+    Every configuration plays the same game seeds, so differences between
+    configurations come from the rules rather than from the players' luck.
+    Inequality is the Gini coefficient of the final self scores, negative
+    scores counting as 0, and the spread between the best and worst of them.
+    """
+    rules = make_rules(config)
+    results = [
+        play_game(seed, game_id, rules=rules, max_moves=max_moves)
+        for game_id in range(games)
+    ]
+    env_scores = np.array([r["env_score"] for r in results])
+    lengths = np.array([r["length"] for r in results])
+    self_scores = np.array([list(r["self_scores"].values()) for r in results])
+    truncated = np.array([r["truncated"] for r in results])
+    return {
+        "games": games,
+        "collapse_rate": float(np.mean(~truncated & (env_scores < COLLAPSE_SCORE))),
+        "truncation_rate": float(np.mean(truncated)),
+        "length_mean": float(lengths.mean()),
+        "length_std": float(lengths.std()),
+        "env_score_mean": float(env_scores.mean()),
+        "gini_mean": float(np.mean([gini(np.clip(s, 0, None)) for s in self_scores])),
+        "spread_mean": float(
+            np.mean(self_scores.max(axis=1) - self_scores.min(axis=1))
+        ),
+    }
+
+
+def _evaluate_star(args):
+    key, config, games, seed, max_moves = args
+    return key, evaluate_config(config, games, seed, max_moves)
+
+
+class ResultCache:
+    """
+    On-disk cache of configuration summaries, one JSON file per key.
+
+    Files are written atomically, so an interrupted sweep leaves only whole
+    entries behind.
+    """
+
+    def __init__(self, directory=DEFAULT_CACHE_DIR):
+        self.directory = directory
+
+    def _path(self, key):
+        return os.path.join(self.directory, key[:2], f"{key}.json")
+
+    def get(self, key):
+        try:
+            with open(self._path(key)) as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+
+    def put(self, key, entry):
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "w") as f:
+            json.dump(entry, f)
+        os.replace(tmp, path)
+
+
+def iter_sweep(configs, games=32, seed=0, workers=None, max_moves=1000, cache_dir=None):
+    """
+    Evaluate sweep configurations over a process pool and yield
+    ``(config, summary)`` pairs, cached ones first, the rest as they finish.
+
+    Parameters:
+    - configs (list): Configurations, see ``make_rules``.
+    - games (int): Games played per configuration.
+    - seed (int): Root seed of every configuration's games.
+    - workers (int): Worker processes, defaults to the number of CPUs.
+    - max_moves (int): Move limit after which a game is truncated.
+    - cache_dir (str): Result cache directory, defaults to DEFAULT_CACHE_DIR.
+    """
+    cache = ResultCache(cache_dir or DEFAULT_CACHE_DIR)
+    settings = {
+        "games": games,
+        "seed": seed,
+        "max_moves": max_moves,
+        "code": code_version(),
+    }
+    # Fail on misspelled parameters before any game is played
+    for config in configs:
+        make_rules(config)
+    pending = {}
+    for config in configs:
+        key = config_key(config, settings)
+        entry = cache.get(key)
+        if entry is not None:
+            yield entry["config"], entry["summary"]
+        elif key not in pending:
+            pending[key] = config
+
+    jobs = [(key, config, games, seed, max_moves) for key, config in pending.items()]
+    workers = workers or os.cpu_count()
+    if workers == 1 or len(jobs) <= 1:
+        finished = map(_evaluate_star, jobs)
+        pool = None
+    else:
+        pool = multiprocessing.Pool(workers)
+        finished = pool.imap_unordered(_evaluate_star, jobs)
+    try:
+        for key, summary in finished:
+            cache.put(key, {"config": pending[key], "summary": summary, **settings})
+            yield pending[key], summary
+    finally:
+        if pool is not None:
+            pool.terminate()
+
+
+def run_sweep(configs, games=32, seed=0, workers=None, max_moves=1000, cache_dir=None):
+    return list(iter_sweep(configs, games, seed, workers, max_moves, cache_dir))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sweep game balance parameters.")
+    parser.add_argument(
+        "space",
+        help="JSON file (or inline JSON) mapping parameters to value lists for "
+        "--design grid, or to [low, high] ranges for random and lhs.",
+    )
+    parser.add_argument("--design", choices=list(DESIGNS), default="grid")
+    parser.add_argument(
+        "--samples", type=int, default=64, help="Configurations of random and lhs."
+    )
+    parser.add_argument("--games", type=int, default=32)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--max-moves", type=int, default=1000)
+    parser.add_argument("--cache", default=DEFAULT_CACHE_DIR)
+    parser.add_argument("--output", default=None, help="Write results as JSON lines.")
+    args = parser.parse_args()
+
+    if os.path.exists(args.space):
+        with open(args.space) as f:
+            space = json.load(f)
+    else:
+        space = json.loads(args.space)
+    if args.design == "grid":
+        configs = grid_design(space)
+    else:
+        configs = DESIGNS[args.design](space, args.samples, args.seed)
+
+    results = []
+    for i, (config, summary) in enumerate(
+        iter_sweep(
+            configs, args.games, args.seed, args.workers, args.max_moves, args.cache
+        )
+    ):
+        results.append({"config": config, **summary})
+        print(
+            f"[{i + 1}/{len(configs)}] collapse {summary['collapse_rate']:.2f} "
+            f"length {summary['length_mean']:.1f} gini {summary['gini_mean']:.2f} "
+            f"{json.dumps(config)}"
+        )
+    if args.output:
+        with open(args.output, "w") as f:
+            for result in results:
+                f.write(json.dumps(result) + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+# symmetry.py
+import random
+from collections import OrderedDict
+import numpy as np
+
+
+def _dihedral(array, t):
+    # Transform t of the square's 8 symmetries, applied to the first two axes:
+    # t % 4 quarter turns, then a transpose when t >= 4
+    array = np.rot90(array, t % 4, axes=(0, 1))
+    return array.swapaxes(0, 1) if t >= 4 else array
+
+
+def symmetry_group(rules):
+    """
+    Indices (0-7) of the board symmetries that leave every building's stencil
+    unchanged. The env score is a board-wide mean, so under these the rules,
+    and therefore the value of a position, are invariant.
+    """
+    kernels = np.moveaxis(rules.kernels, 0, -1)  # Stencil axes first
+    return [t for t in range(8) if np.array_equal(_dihedral(kernels, t), kernels)]
+
+
+class Canonicalizer:
+    """
+    Maps positions of one board size onto a canonical representative of their
+    symmetry class.
+
+    A position is the board (building type and builder of every cell), the
+    resources and the agent to move; the G/V/D grid follows from the
+    buildings. ``key`` returns a hashable canonical key and the symmetry that
+    maps the position onto it, ``transform_action`` maps actions between the
+    two.
+
+    Parameters:
+    - grid_size (int): Side length of the (square) board.
+    - rules (Rules): Compiled rule tables, restricts the symmetries to those
+      the stencils are invariant under.
+    """
+
+    def __init__(self, grid_size, rules):
+        self.grid_size = grid_size
+        self.rules = rules
+        self.symmetries = symmetry_group(rules)
+        cells = np.arange(grid_size**2).reshape(grid_size, grid_size)
+        # permutations[i][j] is the cell that lands on cell j under symmetry i
+        self.permutations = np.stack(
+            [_dihedral(cells, t).ravel() for t in self.symmetries]
+        )
+        self.inverse_permutations = np.argsort(self.permutations, axis=1)
+
+    def canonical_board(self, buildings, builders):
+        """
+        Return the canonical cell codes of a board and the index (into
+        ``symmetries``) of the symmetry producing them.
+        """
+        # One code per cell, 0 for empty cells
+        codes = (buildings.ravel().astype(np.int16) + 1) * 256 + (
+            builders.ravel().astype(np.int16) + 1
+        )
+        candidates = codes[self.permutations]
+        best = min(range(len(candidates)), key=lambda i: candidates[i].tobytes())
+        return candidates[best], best
+
+    def key(self, game):
+        # Canonical key of the position of a SimCityGame, and its symmetry
+        board, symmetry = self.canonical_board(game.buildings, game.builders)
+        return (
+            board.tobytes(),
+            game.resources.tobytes(),
+            game.agents.index(game.agent_selection),
+        ), symmetry
+
+    def transform_action(self, action, symmetry):
+        # Action in the canonical frame of the same building on the same cell
+        cells = self.grid_size**2
+        cell = self.inverse_permutations[symmetry][action % cells]
+        return int(action // cells * cells + cell)
+
+    def untransform_action(self, action, symmetry):
+        # Inverse of transform_action
+        cells = self.grid_size**2
+        cell = self.permutations[symmetry][action % cells]
+        return int(action // cells * cells + cell)
+
+
+class EvaluationCache:
+    """
+    Bounded key -> value cache for position evaluations.
+
+    Parameters:
+    - max_size (int): Number of entries kept.
+    - eviction (str): Entry dropped when full: "lru" (least recently used),
+      "fifo" (oldest inserted) or "random".
+    - seed (int): Seed of the random eviction.
+    """
+
+    EVICTIONS = ("lru", "fifo", "random")
+
+    def __init__(self, max_size=1_000_000, eviction="lru", seed=None):
+        if eviction not in self.EVICTIONS:
+            raise ValueError(f"eviction must be one of {self.EVICTIONS}")
+        self.max_size = max_size
+        self.eviction = eviction
+        self.entries = OrderedDict()
+        self._random = random.Random(seed)
+        # Keys in a dense list, for O(1) random eviction
+        self._keys = []
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, default=None):
+        value = self.entries.get(key, default)
+        if key in self.entries:
+            self.hits += 1
+            if self.eviction == "lru":
+                self.entries.move_to_end(key)
+        else:
+            self.misses += 1
+        return value
+
+    def put(self, key, value):
+        if key not in self.entries:
+            if len(self.entries) >= self.max_size:
+                self._evict()
+            if self.eviction == "random":
+                self._keys.append(key)
+        self.entries[key] = value
+
+    def get_or_compute(self, key, compute):
+        value = self.get(key)
+        if value is None:
+            value = compute()
+            self.put(key, value)
+        return value
+
+    def _evict(self):
+        if self.eviction == "random":
+            # Move the last key into the evicted key's slot
+            slot = self._random.randrange(len(self._keys))
+            key, last = self._keys[slot], self._keys.pop()
+            if slot < len(self._keys):
+                self._keys[slot] = last
+            del self.entries[key]
+        else:
+            self.entries.popitem(last=False)
+
+    def __contains__(self, key):
+        return key in self.entries
+
+    def __len__(self):
+        return len(self.entries)
+
+    def stats(self):
+        return {
+            "size": len(self.entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / max(1, self.hits + self.misses),
+        }
@@ -0,0 +1,36 @@
+# tests/conftest.py
+import logging
+import os
+import sys
+import pytest
+
+# The game modules live at the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import log  # noqa: E402
+
+
+@pytest.fixture
+def live_log(tmp_path, monkeypatch):
+    """
+    Send the live text log to a file in ``tmp_path`` instead of the
+    repository's game_log.txt, formatted as by ``log.setup_logging``.
+    """
+    # Games that log would otherwise call setup_logging on game_log.txt
+    monkeypatch.setattr(log, "_logging_ready", True)
+    monkeypatch.chdir(tmp_path)
+    path = tmp_path / "game_log.txt"
+    handler = logging.FileHandler(path)
+    handler.setFormatter(
+        logging.Formatter("%(asctime)s - %(message)s", datefmt=log.LOG_DATE_FORMAT)
+    )
+    root = logging.getLogger()
+    level = root.level
+    root.addHandler(handler)
+    root.setLevel(logging.INFO)
+    try:
+        yield path
+    finally:
+        root.removeHandler(handler)
+        root.setLevel(level)
+        handler.close()
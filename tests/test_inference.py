@@ -0,0 +1,60 @@
+# tests/test_inference.py
+import asyncio
+import numpy as np
+import pytest
+from core import SimCityGame
+from players import BasePlayer
+from inference import (
+    AsyncInferenceScheduler,
+    InferenceScheduler,
+    random_policy,
+    run_games_async,
+    run_games_threaded,
+)
+
+
+def _observation():
+    game = SimCityGame(log=False)
+    game.players = {agent: BasePlayer(agent) for agent in game.agents}
+    return game.observe(game.agent_selection)
+
+
+def _short_policy(batch):
+    # One action too few
+    return np.zeros(len(batch["action_mask"]) - 1, dtype=np.int64)
+
+
+def test_list_policy_resolves():
+    with InferenceScheduler(lambda batch: [3] * len(batch["grid"])) as scheduler:
+        assert scheduler.submit(_observation()).result(timeout=5) == 3
+
+
+@pytest.mark.parametrize("policy", [_short_policy, lambda batch: None])
+def test_bad_policy_return_fails_every_request(policy):
+    with InferenceScheduler(policy, max_wait=0.05) as scheduler:
+        futures = [scheduler.submit(_observation()) for _ in range(4)]
+        for future in futures:
+            with pytest.raises(ValueError):
+                future.result(timeout=5)
+        # The serving thread survives the bad batch
+        scheduler.policy = random_policy(0)
+        assert isinstance(scheduler.submit(_observation()).result(timeout=5), int)
+
+
+def test_bad_policy_return_async():
+    scheduler = AsyncInferenceScheduler(_short_policy)
+
+    async def main():
+        return await asyncio.gather(
+            *(scheduler.act(_observation()) for _ in range(3)),
+            return_exceptions=True,
+        )
+
+    results = asyncio.run(asyncio.wait_for(main(), timeout=5))
+    assert all(isinstance(r, ValueError) for r in results)
+
+
+@pytest.mark.parametrize("run_games", [run_games_threaded, run_games_async])
+def test_run_games_raises_on_bad_policy(run_games):
+    with pytest.raises(ValueError):
+        run_games(4, _short_policy, concurrency=2)
@@ -0,0 +1,36 @@
+# tests/test_log.py
+from environment import SimCityEnv
+from log import TrajectoryRecorder, render_trajectory
+from players import BalancedPlayer
+
+
+def _play(seed, **kwargs):
+    env = SimCityEnv(**kwargs)
+    env.players = {
+        agent: BalancedPlayer(agent, seed=seed + i)
+        for i, agent in enumerate(env.agents)
+    }
+    return env
+
+
+def _messages(path):
+    # Log lines without their timestamps
+    with open(path) as f:
+        return [line.partition(" - ")[2] or line for line in f]
+
+
+def test_rendered_trajectory_matches_live_log(live_log, tmp_path):
+    env = _play(7, log=True)
+    env.run_game()
+
+    env = _play(7, log=False)
+    with TrajectoryRecorder(tmp_path / "game_log.bin", env) as recorder:
+        env.recorder = recorder
+        env.run_game()
+    render_trajectory(tmp_path / "game_log.bin", tmp_path / "rendered.txt")
+
+    live, rendered = _messages(live_log), _messages(tmp_path / "rendered.txt")
+    assert len(live) > 100
+    for i, (expected, actual) in enumerate(zip(live, rendered)):
+        assert actual == expected, f"line {i + 1}"
+    assert len(rendered) == len(live)
@@ -0,0 +1,31 @@
+# tests/test_log_parser.py
+import pytest
+from core import SimCityGame
+from log_parser import iter_log_records
+from players import BalancedPlayer
+
+
+class _ScoreTracker(BalancedPlayer):
+    # Notes the game's env score whenever it is asked to move, i.e. the score
+    # of the turn block logged just before
+    scores = []
+
+    def select_action(self, observation):
+        self.scores.append(self.game.env_score)
+        return super().select_action(observation)
+
+
+def test_live_log_env_scores(live_log):
+    _ScoreTracker.scores = []
+    game = SimCityGame(grid_size=3, num_players=2, max_moves=20)
+    game.players = {
+        agent: _ScoreTracker(agent, seed=i) for i, agent in enumerate(game.agents)
+    }
+    game.run_game()
+    records = list(iter_log_records(live_log))
+    assert [r.turn for r in records] == list(range(game.num_moves + 1))
+    assert records[0].env_score == 30.0
+    assert [r.env_score for r in records[: len(_ScoreTracker.scores)]] == (
+        pytest.approx(_ScoreTracker.scores)
+    )
+    assert records[-1].env_score == pytest.approx(game.env_score)
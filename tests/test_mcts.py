@@ -0,0 +1,29 @@
+# tests/test_mcts.py
+from functools import partial
+import pytest
+from core import SimCityGame
+from mcts import MCTSPlayer
+from tournament import play_game
+
+# A fixed number of simulations keeps the games fast and reproducible
+FastMCTSPlayer = partial(MCTSPlayer, time_budget=None, iterations=8, rollouts=4)
+
+
+def test_tournament_game_with_mcts_player():
+    # tournament.play_game limits games to 1000 moves by default
+    result = play_game(0, 0, player_classes={"P1": FastMCTSPlayer})
+    assert result["length"] > 0
+    assert result == play_game(0, 0, player_classes={"P1": FastMCTSPlayer})
+
+
+@pytest.mark.parametrize("max_moves", [None, 20, 1000, 40000])
+def test_select_action_with_move_limit(max_moves):
+    game = SimCityGame(grid_size=3, num_players=2, log=False, max_moves=max_moves)
+    game.players = {agent: FastMCTSPlayer(agent, seed=0) for agent in game.agents}
+    game.restart()
+    for _ in range(3):
+        agent = game.agents[game.agent_index]
+        action = game.players[agent].select_action(game.observe(agent))
+        assert game.action_mask(game.agent_selection)[action]
+        game.step(action)
+        game.agent_index = (game.agent_index + 1) % len(game.agents)
@@ -0,0 +1,22 @@
+# tests/test_sweep.py
+import os
+import shutil
+import sweep
+
+ROOT = os.path.dirname(os.path.abspath(sweep.__file__))
+
+
+def test_code_modules_cover_sweep_and_games():
+    modules = sweep.code_modules()
+    assert {"sweep.py", "tournament.py", "core.py", "log.py"} <= set(modules)
+
+
+def test_editing_sweep_changes_code_version(tmp_path):
+    # Copy the modules into a scratch tree and edit sweep.py there
+    for name in sweep.code_modules():
+        shutil.copy(os.path.join(ROOT, name), tmp_path / name)
+    before = sweep.code_version(str(tmp_path))
+    assert before == sweep.code_version()
+    with open(tmp_path / "sweep.py", "a") as f:
+        f.write("\nCOLLAPSE_SCORE = 12\n")
+    assert sweep.code_version(str(tmp_path)) != before
@@ -0,0 +1,148 @@
+# tournament.py
+import argparse
+import json
+import multiprocessing
+import os
+import numpy as np
+from core import SimCityGame
+from players import BalancedPlayer
+
+
+def game_seed_sequence(seed, game_id):
+    # Seed stream of one game, the same whichever worker ends up playing it
+    return np.random.SeedSequence(seed, spawn_key=(game_id,))
+
+
+def play_game(
+    seed, game_id, player_classes=None, rules=None, max_moves=1000, log=False
+):
+    """
+    Play one seeded game and return its result.
+
+    The players of game ``game_id`` draw from child streams of
+    ``SeedSequence(seed, spawn_key=(game_id,))``, so calling this again with
+    the same arguments replays the game exactly.
+
+    Parameters:
+    - seed (int): Root seed of the tournament.
+    - game_id (int): Index of the game within the tournament.
+    - player_classes (dict): Agent name to player class, defaults to BalancedPlayer.
+    - rules (Rules): Compiled rule tables, defaults to the tables in config.py.
+    - max_moves (int): Move limit after which the game is truncated.
+    - log (bool): Write the text game log while playing.
+    """
+    env = SimCityGame(rules=rules, log=log, max_moves=max_moves)
+    player_seeds = game_seed_sequence(seed, game_id).spawn(len(env.agents))
+    env.players = {
+        agent: (player_classes or {}).get(agent, BalancedPlayer)(agent, seed=s)
+        for agent, s in zip(env.agents, player_seeds)
+    }
+    env.run_game()
+    return {
+        "game_id": game_id,
+        "length": env.num_moves,
+        "truncated": env.truncations[env.agent_selection],
+        "env_score": float(env.env_score),
+        "self_scores": {a: p.self_score for a, p in env.players.items()},
+        "integrated_scores": {
+            a: float(p.integrated_score) for a, p in env.players.items()
+        },
+    }
+
+
+def _play_game_star(args):
+    return play_game(*args)
+
+
+def iter_games(
+    n_games, seed=0, workers=None, player_classes=None, rules=None, max_moves=1000
+):
+    """
+    Play ``n_games`` over a process pool and yield each result as it finishes.
+
+    Results arrive in completion order; their ``game_id`` identifies the game.
+    """
+    workers = workers or os.cpu_count()
+    jobs = (
+        (seed, game_id, player_classes, rules, max_moves) for game_id in range(n_games)
+    )
+    if workers == 1:
+        yield from map(_play_game_star, jobs)
+        return
+    chunksize = max(1, min(256, n_games // (workers * 16)))
+    with multiprocessing.Pool(workers) as pool:
+        yield from pool.imap_unordered(_play_game_star, jobs, chunksize=chunksize)
+
+
+def summarize(results):
+    """
+    Aggregate game results into win rates and score distributions.
+
+    A game is won by the agent(s) with the highest integrated score; ties
+    split the win evenly.
+    """
+    results = sorted(results, key=lambda r: r["game_id"])
+    agents = list(results[0]["self_scores"])
+    self_scores = np.array([[r["self_scores"][a] for a in agents] for r in results])
+    integrated = np.array(
+        [[r["integrated_scores"][a] for a in agents] for r in results]
+    )
+    winners = integrated == integrated.max(axis=1, keepdims=True)
+    wins = (winners / winners.sum(axis=1, keepdims=True)).sum(axis=0)
+
+    def distribution(values):
+        return {
+            "mean": float(np.mean(values)),
+            "std": float(np.std(values)),
+            **{f"p{q}": float(np.percentile(values, q)) for q in (5, 25, 50, 75, 95)},
+        }
+
+    return {
+        "games": len(results),
+        "truncation_rate": float(np.mean([r["truncated"] for r in results])),
+        "win_rates": {a: float(w / len(results)) for a, w in zip(agents, wins)},
+        "self_scores": {
+            a: distribution(self_scores[:, i]) for i, a in enumerate(agents)
+        },
+        "integrated_scores": {
+            a: distribution(integrated[:, i]) for i, a in enumerate(agents)
+        },
+        "env_score": distribution([r["env_score"] for r in results]),
+        "length": distribution([r["length"] for r in results]),
+    }
+
+
+def run_tournament(
+    n_games, seed=0, workers=None, player_classes=None, rules=None, max_moves=1000
+):
+    return summarize(
+        iter_games(n_games, seed, workers, player_classes, rules, max_moves)
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a self-play tournament.")
+    parser.add_argument("--games", type=int, default=1000)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--max-moves", type=int, default=1000)
+    parser.add_argument(
+        "--replay",
+        type=int,
+        default=None,
+        metavar="GAME_ID",
+        help="Replay a single game of the tournament with the text game log on.",
+    )
+    args = parser.parse_args()
+
+    if args.replay is not None:
+        result = play_game(args.seed, args.replay, max_moves=args.max_moves, log=True)
+    else:
+        result = run_tournament(
+            args.games, args.seed, args.workers, max_moves=args.max_moves
+        )
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,268 @@
+# vector_env.py
+import numpy as np
+from config import RESOURCE_TYPES
+from rules import DEFAULT_RULES
+from render import TileAtlas, render_frames
+
+PENALTY = 5
+
+
+class VectorSimCityEnv:
+    """
+    Steps ``num_envs`` independent SimCity games at once.
+
+    Every game is stored as a slice of stacked arrays, and ``step`` applies one
+    action per game with the same rules as ``SimCityEnv.step``: occupied cells
+    and unaffordable buildings cost a penalty, placements apply the self and
+    neighbor effects, every building pays passive income to the agent that
+    moved, and a game ends once its board is full or its env score drops
+    below 10.
+
+    Parameters:
+    - num_envs (int): Number of games stepped together.
+    - grid_size (int): Side length of each (square) board.
+    - n_agents (int): Number of players taking turns in each game.
+    - starting_resources (dict): Resources every agent starts with (20 each
+      by default).
+    - autoreset (bool): Reset games as soon as they terminate.
+    - rules (Rules): Compiled rule tables, defaults to the tables in config.py.
+    """
+
+    def __init__(
+        self,
+        num_envs,
+        grid_size=4,
+        n_agents=3,
+        starting_resources=None,
+        autoreset=False,
+        rules=None,
+    ):
+        self.rules = rules if rules is not None else DEFAULT_RULES
+        self.num_envs = num_envs
+        self.grid_size = grid_size
+        self.n_agents = n_agents
+        self.agents = [f"P{i + 1}" for i in range(n_agents)]
+        self.autoreset = autoreset
+        self.starting_resources = np.array(
+            [(starting_resources or {}).get(r, 20) for r in RESOURCE_TYPES],
+            dtype=np.int32,
+        )
+        self.num_actions = grid_size**2 * self.rules.num_types
+        # SimCityEnv.reset advances its agent selector twice, so the second
+        # agent makes the first move
+        self.first_agent = 1 % n_agents
+
+        self._env_ids = np.arange(num_envs)
+        self.reset()
+
+    def reset(self, mask=None):
+        """
+        Reset every game, or only the games selected by the boolean ``mask``.
+        """
+        n, size = self.num_envs, self.grid_size
+        if mask is None:
+            self.grid = np.full((n, size, size, 3), 30, dtype=np.int32)  # G, V, D
+            self.buildings = np.full((n, size, size), -1, dtype=np.int8)
+            self.builders = np.full((n, size, size), -1, dtype=np.int8)
+            self.resources = np.empty(
+                (n, self.n_agents, len(RESOURCE_TYPES)), dtype=np.int32
+            )
+            self.resources[...] = self.starting_resources
+            self.self_scores = np.zeros((n, self.n_agents), dtype=np.int64)
+            self.integrated_scores = np.zeros((n, self.n_agents), dtype=np.float64)
+            self.num_moves = np.zeros(n, dtype=np.int32)
+            self.agent_index = np.full(n, self.first_agent, dtype=np.int8)
+            self.terminated = np.zeros(n, dtype=bool)
+            # Running sums so the env score never rescans the boards
+            self._grid_sums = self.grid.sum(axis=(1, 2), dtype=np.int64)
+            self._type_counts = np.zeros((n, self.rules.num_types), dtype=np.int32)
+            self._num_buildings = np.zeros(n, dtype=np.int32)
+        else:
+            mask = np.asarray(mask, dtype=bool)
+            self.grid[mask] = 30
+            self.buildings[mask] = -1
+            self.builders[mask] = -1
+            self.resources[mask] = self.starting_resources
+            self.self_scores[mask] = 0
+            self.integrated_scores[mask] = 0
+            self.num_moves[mask] = 0
+            self.agent_index[mask] = self.first_agent
+            self.terminated[mask] = False
+            self._grid_sums[mask] = 30 * size * size
+            self._type_counts[mask] = 0
+            self._num_buildings[mask] = 0
+        self.env_scores = self.calculate_environment_scores()
+
+    def step(self, actions):
+        """
+        Apply one action per game for the agent whose turn it is.
+
+        Terminated games ignore their action and receive a reward of 0.
+
+        Returns:
+        - rewards (np.array): Reward of the acting agent in each game.
+        - terminated (np.array): Whether each game is over after this step.
+        - info (dict): ``agent`` (index of the agent that acted) and
+          ``resources`` (build cost plus immediate utility, as in
+          ``SimCityEnv.infos``).
+        """
+        size = self.grid_size
+        ids = self._env_ids
+        types, x, y = self.decode_actions(actions)
+
+        active = ~self.terminated
+        agents = self.agent_index.astype(np.intp)
+        rules = self.rules
+        costs = rules.costs[types]
+        empty = self.buildings[ids, x, y] < 0
+        affordable = np.all(self.resources[ids, agents] >= costs, axis=1)
+        place = active & empty & affordable
+
+        rewards = np.where(place, rules.utility_rewards[types], -PENALTY)
+        info_resources = np.where(
+            place[:, None], rules.utilities[types] - costs, 0
+        ).astype(np.int32)
+
+        # Place the buildings and deduct their costs
+        g, t, px, py = ids[place], types[place], x[place], y[place]
+        self.resources[g, agents[place]] -= costs[place]
+        self.buildings[g, px, py] = t
+        self.builders[g, px, py] = agents[place]
+        self._type_counts[g, t] += 1
+        self._num_buildings[g] += 1
+
+        # Update the grid with building effects, one stencil offset at a time
+        for k, (dx, dy) in enumerate(rules.offsets):
+            effects = rules.offset_effects[t, k]
+            nx, ny = px + dx, py + dy
+            inside = (nx >= 0) & (nx < size) & (ny >= 0) & (ny < size)
+            self.grid[g[inside], nx[inside], ny[inside]] += effects[inside]
+            self._grid_sums[g[inside]] += effects[inside]
+
+        # Apply ongoing building utilities to the acting agent
+        g, a = ids[active], agents[active]
+        passive = self._type_counts[active] @ rules.utilities
+        self.resources[g, a] += passive
+        rewards[active] += passive.sum(axis=1)
+        rewards[~active] = 0
+        self.self_scores[g, a] += rewards[active]
+
+        # Update the environment and integrated scores
+        self.env_scores = self.calculate_environment_scores()
+        alpha, beta = rules.alpha, rules.beta
+        self.integrated_scores[g, a] = (
+            alpha * self.self_scores[g, a] + beta * self.env_scores[active]
+        )
+
+        # Check for game end conditions and advance to the next agent
+        self.num_moves[active] += 1
+        self.terminated |= active & self.is_game_over()
+        self.agent_index[active] = (a + 1) % self.n_agents
+
+        terminated = self.terminated.copy()
+        info = {"agent": agents, "resources": info_resources}
+        if self.autoreset and terminated.any():
+            self.reset(terminated)
+        return rewards, terminated, info
+
+    def load_game(self, game):
+        """
+        Copy the state of one ``SimCityGame`` into every game, e.g. to play
+        ``num_envs`` rollouts from the same position.
+        """
+        self.grid[...] = game.grid
+        self.buildings[...] = game.buildings
+        self.builders[...] = game.builders
+        self.resources[...] = game.resources
+        self.self_scores[...] = game.self_scores
+        self.integrated_scores[...] = game.integrated_scores
+        self.num_moves[...] = game.num_moves
+        self.agent_index[...] = game.agents.index(game.agent_selection)
+        built = game.buildings[game.buildings >= 0]
+        self._grid_sums[...] = game.grid.sum(axis=(0, 1))
+        self._type_counts[...] = np.bincount(built, minlength=self.rules.num_types)
+        self._num_buildings[...] = built.size
+        self.env_scores = self.calculate_environment_scores()
+        self.terminated[...] = game.is_game_over()
+
+    def load_states(self, grid, buildings, resources, agent_index, num_moves=0):
+        """
+        Set every game to its own position, given as ``(num_envs, ...)`` arrays
+        of the grid, buildings, resources and agent to move. Builders are
+        cleared and scores zeroed, so rewards count from here.
+        """
+        self.grid[...] = grid
+        self.buildings[...] = buildings
+        self.builders[...] = -1
+        self.resources[...] = resources
+        self.self_scores[...] = 0
+        self.integrated_scores[...] = 0
+        self.num_moves[...] = num_moves
+        self.agent_index[...] = agent_index
+        self._grid_sums[...] = self.grid.sum(axis=(1, 2))
+        flat = self.buildings.reshape(self.num_envs, -1).astype(np.intp)
+        self._type_counts[...] = 0
+        np.add.at(self._type_counts, (self._env_ids[:, None], flat), flat >= 0)
+        self._num_buildings[...] = self._type_counts.sum(axis=1)
+        self.env_scores = self.calculate_environment_scores()
+        self.terminated[...] = self.is_game_over()
+
+    def sample_actions(self, rng):
+        # One uniformly random legal action per game for the agent to move, or
+        # -1 where it has none
+        resources = self.resources[self._env_ids, self.agent_index]
+        affordable = np.all(resources[:, None, :] >= self.rules.costs, axis=2)
+        empty = self.buildings.reshape(self.num_envs, -1) < 0
+        types = np.argmax(affordable * rng.random(affordable.shape), axis=1)
+        cells = np.argmax(empty * rng.random(empty.shape), axis=1)
+        legal = affordable.any(axis=1) & empty.any(axis=1)
+        return np.where(legal, types * self.grid_size**2 + cells, -1)
+
+    def decode_actions(self, actions):
+        # Vectorized SimCityEnv.decode_action, invalid actions fall back to
+        # ("Park", 0, 0) and building types are returned as indices
+        actions = np.asarray(actions, dtype=np.int64)
+        actions = np.where((actions >= 0) & (actions < self.num_actions), actions, 0)
+        cells = self.grid_size**2
+        return (
+            actions // cells,
+            (actions % cells) // self.grid_size,
+            actions % self.grid_size,
+        )
+
+    def calculate_environment_scores(self):
+        averages = self._grid_sums / self.grid_size**2
+        return (
+            (1 / 3) * averages[:, 0]
+            + (1 / 3) * averages[:, 1]
+            + (1 / 3) * averages[:, 2]
+        )
+
+    def is_game_over(self):
+        # Game ends when the board is filled or environment score < 10
+        board_filled = self._num_buildings == self.grid_size**2
+        return board_filled | (self.env_scores < 10)
+
+    def observe(self):
+        # Observations of the agent to move in every game
+        return {
+            "grid": self.grid.copy(),
+            "resources": self.resources[self._env_ids, self.agent_index].copy(),
+            "builders": self.builders.copy(),
+            "action_mask": self.action_masks(),
+        }
+
+    def render(self, tile=16):
+        # RGB frames of every game, shaped (num_envs, H * tile, W * tile, 3)
+        if getattr(self, "_atlas", None) is None or self._atlas.tile != tile:
+            self._atlas = TileAtlas(self.rules.num_types, self.n_agents, tile)
+        return render_frames(self._atlas, self.buildings, self.builders, self.grid)
+
+    def action_masks(self):
+        # Legal actions (affordable building type x empty cell) of the agent to
+        # move, shaped (num_envs, num_actions)
+        resources = self.resources[self._env_ids, self.agent_index]
+        affordable = np.all(resources[:, None, :] >= self.rules.costs, axis=2)
+        empty = self.buildings.reshape(self.num_envs, -1) < 0
+        mask = affordable[:, :, None] & empty[:, None, :]
+        return mask.reshape(self.num_envs, -1).view(np.int8)